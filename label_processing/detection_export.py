@@ -0,0 +1,249 @@
+# Import third-party libraries
+from __future__ import annotations
+import abc
+import torch
+import detecto.utils
+import numpy as np
+from pathlib import Path
+from detecto.core import Model
+
+
+# Backends of PredictLabel and the file endings of their exported models
+BACKENDS = ("detecto", "torchscript", "onnx", "quantized")
+SUFFIXES = {"torchscript": ".pt", "onnx": ".onnx", "quantized": "_int8.pt"}
+ONNX_OPSET = 11
+
+
+#---------------------Export---------------------#
+
+
+def exported_model_path(path_to_model: str | Path, backend: str) -> Path:
+    """
+    Get the path of the exported model belonging to a Detecto state dict.
+
+    Args:
+        path_to_model (str|Path): Path to the Detecto state dict (.pth).
+        backend (str): Backend the model is exported for.
+
+    Returns:
+        Path: Path to the exported model, e.g. label_detection_model.onnx.
+    """
+    if backend not in SUFFIXES:
+        raise ValueError(f"Backend '{backend}' has no exported model.")
+    path_to_model = Path(path_to_model)
+    return path_to_model.with_name(path_to_model.stem + SUFFIXES[backend])
+
+
+def export_torchscript(model: Model, out_path: str | Path) -> Path:
+    """
+    Export the torchvision model inside a Detecto model to TorchScript.
+
+    Args:
+        model (detecto.core.Model): Detecto model with loaded weights.
+        out_path (str|Path): Path of the exported model.
+
+    Returns:
+        Path: Path of the exported model.
+    """
+    internal_model = model.get_internal_model().eval().to("cpu")
+    scripted_model = torch.jit.script(internal_model)
+    scripted_model.save(str(out_path))
+    return Path(out_path)
+
+
+def export_onnx(model: Model, out_path: str | Path,
+                opset: int = ONNX_OPSET) -> Path:
+    """
+    Export the torchvision model inside a Detecto model to ONNX.
+
+    The exported graph takes one normalized image tensor of shape (3, H, W)
+    with dynamic height and width and returns boxes, labels and scores.
+
+    Args:
+        model (detecto.core.Model): Detecto model with loaded weights.
+        out_path (str|Path): Path of the exported model.
+        opset (int, optional): ONNX opset version. Defaults to ONNX_OPSET.
+
+    Returns:
+        Path: Path of the exported model.
+    """
+    internal_model = model.get_internal_model().eval().to("cpu")
+    example = [torch.rand(3, 800, 1067)]
+    torch.onnx.export(internal_model, (example,), str(out_path),
+                      opset_version=opset,
+                      input_names=["image"],
+                      output_names=["boxes", "labels", "scores"],
+                      dynamic_axes={"image": {1: "height", 2: "width"},
+                                    "boxes": {0: "detections"},
+                                    "labels": {0: "detections"},
+                                    "scores": {0: "detections"}},
+                      dynamo=False)
+    return Path(out_path)
+
+
+def export_quantized(model: Model, out_path: str | Path) -> Path:
+    """
+    Export an int8 quantized variant of the model for CPU inference to
+    TorchScript.
+
+    The linear layers of the box head and predictor are quantized dynamically
+    (int8 weights, activations quantized on the fly). The convolutional
+    backbone, RPN and ROI pooling stay in float32.
+
+    Args:
+        model (detecto.core.Model): Detecto model with loaded weights.
+        out_path (str|Path): Path of the exported model.
+
+    Returns:
+        Path: Path of the exported model.
+    """
+    internal_model = model.get_internal_model().eval().to("cpu")
+    quantized_model = torch.ao.quantization.quantize_dynamic(
+        internal_model, {torch.nn.Linear}, dtype=torch.qint8)
+    scripted_model = torch.jit.script(quantized_model)
+    scripted_model.save(str(out_path))
+    return Path(out_path)
+
+
+#---------------------Runtime---------------------#
+
+
+class ExportedModel(abc.ABC):
+    """
+    Base class for running an exported label detection model with the same
+    predict interface as detecto.core.Model.
+
+    The loaded runtime cannot be pickled; it is left out when the model is
+    pickled (e.g. sent to a worker process) and loaded again from
+    path_to_model when it is unpickled.
+
+    Attributes:
+        path_to_model (Path): Path to the exported model file.
+        classes (list): Class names, including '__background__' at index 0.
+    """
+    # attributes set by _load, which are not pickled
+    _runtime_attributes: tuple[str, ...] = ()
+
+    def __init__(self, path_to_model: str | Path, classes: list) -> None:
+        """
+        Init Method for the ExportedModel Class.
+
+        Args:
+            path_to_model (str|Path): Path to the exported model file.
+            classes (list): List of classes.
+        """
+        self.path_to_model = Path(path_to_model)
+        self.classes = ['__background__'] + classes
+        self._transform = detecto.utils.default_transforms()
+        self._load()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for attribute in self._runtime_attributes:
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._load()
+
+    @abc.abstractmethod
+    def _load(self) -> None:
+        """
+        Load the exported model from path_to_model.
+        """
+
+    @abc.abstractmethod
+    def _run(self, images: list[torch.Tensor]) -> list[dict[str, torch.Tensor]]:
+        """
+        Run the exported graph on a list of normalized image tensors.
+
+        Args:
+            images (list[torch.Tensor]): Images of shape (3, H, W).
+
+        Returns:
+            list[dict[str, torch.Tensor]]: Boxes, labels and scores per image.
+        """
+
+    def predict(self, images: np.ndarray | torch.Tensor | list) -> tuple | list[tuple]:
+        """
+        Predict labels on an image or a list of images like
+        detecto.core.Model.predict.
+
+        Args:
+            images (np.ndarray|torch.Tensor|list): Image or list of images, either
+                loaded by detecto or already transformed to tensors.
+
+        Returns:
+            tuple|list[tuple]: Labels, boxes and scores of a single image or a
+                list of them for a list of images.
+        """
+        is_single_image = not isinstance(images, (list, tuple))
+        images = [images] if is_single_image else images
+        images = [image if isinstance(image, torch.Tensor)
+                  else self._transform(image) for image in images]
+        results = []
+        with torch.no_grad():
+            for prediction in self._run(images):
+                labels = [self.classes[int(label)] for label in prediction['labels']]
+                results.append((labels, prediction['boxes'], prediction['scores']))
+        return results[0] if is_single_image else results
+
+
+class TorchScriptModel(ExportedModel):
+    """
+    Label detection model exported with torch.jit.script.
+    """
+    _runtime_attributes = ("model",)
+
+    def _load(self) -> None:
+        self.model = torch.jit.load(str(self.path_to_model), map_location="cpu")
+        self.model.eval()
+
+    def _run(self, images: list[torch.Tensor]) -> list[dict[str, torch.Tensor]]:
+        # scripted detection models return (losses, detections)
+        _, detections = self.model(images)
+        return detections
+
+
+class OnnxModel(ExportedModel):
+    """
+    Label detection model exported to ONNX and run with ONNX Runtime on CPU.
+    """
+    _runtime_attributes = ("session",)
+
+    def _load(self) -> None:
+        # imported here, so that the other backends do not load onnxruntime
+        import onnxruntime
+        self.session = onnxruntime.InferenceSession(
+            str(self.path_to_model), providers=["CPUExecutionProvider"])
+
+    def _run(self, images: list[torch.Tensor]) -> list[dict[str, torch.Tensor]]:
+        detections = []
+        for image in images:
+            boxes, labels, scores = self.session.run(
+                None, {"image": image.numpy()})
+            detections.append({'boxes': torch.from_numpy(boxes),
+                               'labels': torch.from_numpy(labels),
+                               'scores': torch.from_numpy(scores)})
+        return detections
+
+
+def load_exported_model(path_to_model: str | Path, classes: list,
+                        backend: str) -> ExportedModel:
+    """
+    Load an exported label detection model for the given backend.
+
+    Args:
+        path_to_model (str|Path): Path to the exported model file.
+        classes (list): List of classes.
+        backend (str): Either 'torchscript', 'onnx' or 'quantized'.
+
+    Returns:
+        ExportedModel: Model with a detecto-like predict method.
+    """
+    if backend in ("torchscript", "quantized"):
+        return TorchScriptModel(path_to_model, classes)
+    if backend == "onnx":
+        return OnnxModel(path_to_model, classes)
+    raise ValueError(f"Unknown backend '{backend}', choose one of {BACKENDS}.")
@@ -0,0 +1,126 @@
+# Import third-party libraries
+from __future__ import annotations
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator
+
+FSYNC_SECONDS = 5.0 #maximal time between two syncs of the journal file
+
+
+#---------------------JSON Lines Journal---------------------#
+
+
+class JsonlJournal():
+    """
+    Append-only JSON Lines file with one entry per finished item, so that an
+    interrupted run can be resumed.
+
+    The entries are written ASCII-escaped, so a line cut off by an
+    interruption never ends inside a multibyte character; files are read and
+    repaired in binary mode and unreadable lines are skipped. The file is
+    kept open with a buffered writer and synced to disk at most every
+    fsync_seconds and on close. It is meant to be written by one thread.
+
+    Attributes:
+        path (Path): Path to the journal file.
+        fsync_seconds (float): Maximal time between two syncs.
+    """
+
+    def __init__(self, path: str | Path, fsync_seconds: float = FSYNC_SECONDS) -> None:
+        """
+        Init Method for the JsonlJournal Class.
+
+        Args:
+            path (str|Path): Path to the journal file.
+            fsync_seconds (float, optional): Maximal time between two syncs.
+                Defaults to FSYNC_SECONDS.
+        """
+        self.path = Path(path)
+        self.fsync_seconds = fsync_seconds
+        self._file = None
+        self._last_sync = 0.0
+
+    def entries(self) -> Iterator[dict]:
+        """
+        Read the entries of the journal. Lines that cannot be decoded, e.g.
+        a line that was cut off by an interruption, are skipped.
+
+        Yields:
+            dict: The entries in the order they were written.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if isinstance(entry, dict):
+                    yield entry
+
+    def open(self, resume: bool = False) -> JsonlJournal:
+        """
+        Open the journal for writing.
+
+        Args:
+            resume (bool, optional): Append to an existing journal instead of
+                starting a new one. Defaults to False.
+
+        Returns:
+            JsonlJournal: The opened journal.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._file = open(self.path, "ab+")
+            # terminate a line that was cut off by an interruption
+            if self._file.tell() > 0:
+                self._file.seek(-1, os.SEEK_END)
+                if self._file.read(1) != b"\n":
+                    self._file.write(b"\n")
+        else:
+            self._file = open(self.path, "wb")
+        self._last_sync = time.monotonic()
+        return self
+
+    def write_entry(self, entry: dict) -> None:
+        """
+        Append an entry, the file is synced if fsync_seconds have passed.
+
+        Args:
+            entry (dict): JSON serializable entry.
+        """
+        self._file.write(json.dumps(entry).encode("ascii") + b"\n")
+        if time.monotonic() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def flush(self) -> None:
+        """
+        Hand the buffer to the operating system without waiting for the disk.
+        """
+        self._file.flush()
+
+    def sync(self) -> None:
+        """
+        Write the buffer to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Sync and close the journal.
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> JsonlJournal:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,15 +1,65 @@
 # Import third-party libraries
+from __future__ import annotations
 import cv2
 import torch
 import os
 import glob
 import detecto.utils
 import concurrent.futures
+import json
+import math
+import multiprocessing.util
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from detecto.core import Model
 import label_processing.utils
+from label_processing.detection_export import (BACKENDS, ExportedModel,
+                                               load_exported_model)
+from label_processing.result_cache import ResultCache
+from label_processing.journal import JsonlJournal
+
+# Numeric columns of the prediction DataFrames
+COORDINATES = ['xmin', 'ymin', 'xmax', 'ymax']
+TILE_OVERLAP = 256
+TILE_MERGE_THRESHOLD = 0.5
+BATCHES_PER_TASK = 4 #batches per task of prediction_parallel
+CROP_THREADS = 4 #threads of create_crops, each holds one decoded picture
+# input size of torchvision's Faster R-CNN, which resizes every image itself
+DETECTOR_MIN_SIZE = 800
+DETECTOR_MAX_SIZE = 1333
+
+
+def _predictions_to_dict(dataframe: pd.DataFrame) -> dict[str, list]:
+    """
+    Convert the predictions of one JPG file into a JSON serializable dict.
+
+    Args:
+        dataframe (pd.DataFrame): Pandas DataFrame with prediction results.
+
+    Returns:
+        dict[str, list]: Class, score and coordinate values per column.
+    """
+    return {column: dataframe[column].tolist()
+            for column in ['class', 'score'] + COORDINATES}
+
+
+def _predictions_from_dict(filename: str, values: dict[str, list]) -> pd.DataFrame:
+    """
+    Rebuild the predictions of one JPG file from _predictions_to_dict.
+
+    Args:
+        filename (str): Name of the JPG file.
+        values (dict[str, list]): Class, score and coordinate values per column.
+
+    Returns:
+        pd.DataFrame: Pandas DataFrame with prediction results.
+    """
+    dataframe = pd.DataFrame({'filename': [filename] * len(values['class']),
+                              'class': values['class']})
+    for column in ['score'] + COORDINATES:
+        dataframe[column] = np.array(values[column], dtype=np.float32)
+    return dataframe
 
 
 #---------------------Image Segmentation---------------------#
@@ -24,12 +74,26 @@ class PredictLabel():
         classes (list): List of classes used in the model.
         jpg_path (str|Path|None): Path to a specific JPG file for prediction.
         threshold (float): Threshold value for scores. Defaults to 0.8.
-        model (detecto.core.Model): Trained object detection model.
+        inference_max_side (int|None): Longest image side used for inference.
+            Defaults to None (full resolution).
+        backend (str): Runtime of the model, 'detecto', 'torchscript', 'onnx'
+            or 'quantized'.
+        cache (ResultCache|None): Cache of predictions keyed by image content,
+            model file and settings. Defaults to None (no caching).
+        tile_size (int|None): Side length of the tiles for tiled inference.
+            Defaults to None (whole image at once).
+        tile_overlap (int): Overlap of neighbouring tiles in pixels.
+        model (detecto.core.Model|ExportedModel): Trained object detection model.
     """
 
     def __init__(self, path_to_model: str, classes: list,
                  jpg_path: str | Path | None = None,
-                 threshold: float = 0.8) -> None:
+                 threshold: float = 0.8,
+                 inference_max_side: int | None = None,
+                 backend: str = "detecto",
+                 cache: ResultCache | None = None,
+                 tile_size: int | None = None,
+                 tile_overlap: int = TILE_OVERLAP) -> None:
         """
         Init Method for the PredictLabel Class.
 
@@ -38,12 +102,45 @@ class PredictLabel():
             classes (list): List of classes.
             jpg_path (str|Path|None): Path to JPG file for prediction.
             threshold (float, optional): Threshold value for scores.
+            inference_max_side (int|None, optional): If set, the model runs on
+                images with this longest side instead of its default input size
+                (shortest side DETECTOR_MIN_SIZE, longest side at most
+                DETECTOR_MAX_SIZE); larger images are downsampled before, smaller
+                ones are upsampled by the model. The boxes are scaled back to
+                the original image. Not supported by the 'onnx' backend, whose
+                input size is fixed in the exported graph.
+            backend (str, optional): 'detecto' loads the state dict into a
+                Detecto model, 'torchscript', 'onnx' and 'quantized' (int8)
+                run a model exported by scripts/processing/export_detection.py.
+                Defaults to 'detecto'.
+            cache (ResultCache|None, optional): If given, predictions are
+                looked up in the cache before running the model and stored
+                afterwards. Defaults to None.
+            tile_size (int|None, optional): If set, images larger than
+                tile_size are detected in overlapping square tiles, so that the
+                memory needed for inference is bounded by the tile size.
+                Defaults to None.
+            tile_overlap (int, optional): Overlap of neighbouring tiles in
+                pixels, should be larger than the largest label. Defaults to
+                TILE_OVERLAP.
         """
         self.path_to_model = path_to_model
         self.classes = classes
         self.jpg_path = jpg_path
         self.threshold = threshold
+        self.inference_max_side = inference_max_side
+        if tile_size is not None and tile_size <= tile_overlap:
+            raise ValueError("tile_size has to be larger than tile_overlap")
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', choose one of {BACKENDS}.")
+        self.backend = backend
         self.model = self.retrieve_model()
+        self._set_input_size()
+        self.cache = cache
+        self._model_hash = label_processing.utils.file_sha256(self.path_to_model) \
+            if cache is not None else None
 
         
     @property
@@ -61,18 +158,25 @@ class PredictLabel():
         elif (isinstance(jpg_path,Path)):
             self._jpg_path = jpg_path
             
-    def retrieve_model(self) -> detecto.core.Model:
+    def retrieve_model(self) -> detecto.core.Model | ExportedModel:
         """
         Retrieve the trained object detection model.
 
         Returns:
-            detecto.core.Model: Trained object detection model.
+            detecto.core.Model|ExportedModel: Trained object detection model.
         """
         if not os.path.exists(self.path_to_model):
             raise FileNotFoundError(f"Model file '{self.path_to_model}' not found.")
         
         if os.path.getsize(self.path_to_model) == 0:
             raise IOError(f"Model file '{self.path_to_model}' is empty.")
+
+        if self.backend != "detecto":
+            try:
+                return load_exported_model(self.path_to_model, self.classes,
+                                           self.backend)
+            except Exception as e:
+                raise IOError(f"Error loading model file '{self.path_to_model}': {e}")
         
         model_type = Model.DEFAULT
         model = Model(self.classes, model_name=model_type)
@@ -85,7 +189,148 @@ class PredictLabel():
             raise IOError(f"Error loading model file '{self.path_to_model}': {e}")
         
         return model
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        # exported models are loaded again when unpickled
+        self._set_input_size()
     
+    @property
+    def inference_max_side(self) -> int | None:
+        """int|None: Property for the longest image side used for inference."""
+        return self._inference_max_side
+
+    @inference_max_side.setter
+    def inference_max_side(self, inference_max_side: int | None):
+        """Setter for the longest image side used for inference."""
+        if inference_max_side is not None and inference_max_side < 1:
+            raise ValueError("inference_max_side has to be a positive integer")
+        self._inference_max_side = inference_max_side
+        if hasattr(self, "model"):
+            self._set_input_size()
+
+    def _set_input_size(self) -> None:
+        """
+        Set the input size of the model's own resize step to
+        inference_max_side, or back to its default without it.
+
+        The model resizes every image so that its shortest side has min_size,
+        unless its longest side would exceed max_size. With both set to
+        inference_max_side the longest side of the network input is
+        inference_max_side for every image.
+        """
+        if self.backend == "onnx":
+            if self.inference_max_side is not None:
+                raise ValueError("inference_max_side is not supported by the "
+                                 "onnx backend")
+            return
+        if self.backend == "detecto":
+            transform = self.model.get_internal_model().transform
+        else:
+            transform = self.model.model.transform
+        if self.inference_max_side is None:
+            transform.min_size = (DETECTOR_MIN_SIZE,)
+            transform.max_size = DETECTOR_MAX_SIZE
+        else:
+            transform.min_size = (self.inference_max_side,)
+            transform.max_size = self.inference_max_side
+
+    def _downsample(self, image: np.ndarray) -> tuple[np.ndarray, float]:
+        """
+        Downsample an image to inference_max_side. The model would resize it
+        to this size anyway, but shrinking the decoded image with cv2 first
+        is cheaper and keeps the image tensor small.
+
+        Args:
+            image (np.ndarray): Image loaded by cv2.
+
+        Returns:
+            tuple[np.ndarray, float]: The (possibly) downsampled image and the
+                factor to scale its boxes back to the original image.
+        """
+        max_side = max(image.shape[:2])
+        if self.inference_max_side is None or max_side <= self.inference_max_side:
+            return image, 1.0
+        scale = self.inference_max_side / max_side
+        height, width = image.shape[:2]
+        image = cv2.resize(image, (round(width * scale), round(height * scale)),
+                           interpolation=cv2.INTER_AREA)
+        return image, 1 / scale
+
+    @staticmethod
+    def _rescale_prediction(prediction: tuple, factor: float) -> tuple:
+        """
+        Scale the boxes of a detecto prediction by a factor.
+
+        Args:
+            prediction (tuple): Labels, boxes and scores returned by detecto.
+            factor (float): Factor by which the box coordinates are multiplied.
+
+        Returns:
+            tuple: Labels, rescaled boxes and scores.
+        """
+        if factor == 1.0:
+            return prediction
+        labels, boxes, scores = prediction
+        return labels, boxes * factor, scores
+
+    @staticmethod
+    def _prediction_to_dataframe(jpg_path: Path, prediction: tuple) -> pd.DataFrame:
+        """
+        Convert a detecto prediction for one image into a DataFrame.
+
+        Args:
+            jpg_path (Path): Path to the JPG file the prediction belongs to.
+            prediction (tuple): Labels, boxes and scores returned by detecto.
+
+        Returns:
+            pd.DataFrame: Pandas DataFrame with prediction results.
+        """
+        labels, boxes, scores = prediction
+        boxes = boxes.numpy().astype(np.float32)
+        return pd.DataFrame({'filename': [jpg_path.name] * len(labels),
+                             'class': labels,
+                             'score': scores.numpy().astype(np.float32),
+                             'xmin': boxes[:, 0],
+                             'ymin': boxes[:, 1],
+                             'xmax': boxes[:, 2],
+                             'ymax': boxes[:, 3]})
+    
+    def _from_cache(self, jpg_path: Path) -> tuple[pd.DataFrame | None,
+                                                   str | None]:
+        """
+        Look up the predictions of a JPG file in the cache.
+
+        Args:
+            jpg_path (Path): Path to the JPG file.
+
+        Returns:
+            tuple[pd.DataFrame|None, str|None]: The cached predictions (None on
+                a cache miss) and the cache key (None without cache).
+        """
+        if self.cache is None:
+            return None, None
+        key = (f"{label_processing.utils.file_sha256(str(jpg_path))}:"
+               f"{self._model_hash}:{self.threshold}:"
+               f"{self.inference_max_side}:{self.backend}:"
+               f"{self.tile_size}:{self.tile_overlap}")
+        value = self.cache.get(key)
+        if value is None:
+            return None, key
+        return _predictions_from_dict(jpg_path.name, json.loads(value)), key
+
+    def _to_cache(self, key: str | None, dataframe: pd.DataFrame) -> None:
+        """
+        Store the predictions of a JPG file in the cache.
+
+        Args:
+            key (str|None): Cache key returned by _from_cache.
+            dataframe (pd.DataFrame): Pandas DataFrame with prediction results.
+        """
+        if key is None:
+            return
+        self.cache.put(key, json.dumps(_predictions_to_dict(dataframe)))
+
     def class_prediction(self, jpg_path: Path = None) -> pd.DataFrame:
         """
         Predict labels for a given JPG file.
@@ -98,33 +343,400 @@ class PredictLabel():
         """
         if jpg_path is None:
             jpg_path = self.jpg_path
-        image = detecto.utils.read_image(str(jpg_path))
-        predictions = self.model.predict(image)
-        labels, boxes, scores = predictions
-        
-        entries = []  # List to store all entries for each label
-        for i, labelname in enumerate(labels):
-            entry = {}
-            entry['filename'] = jpg_path.name
-            entry['class'] = labelname
-            entry['score'] = scores[i].item()
-            entry['xmin'] = boxes[i][0]
-            entry['ymin'] = boxes[i][1]
-            entry['xmax'] = boxes[i][2]
-            entry['ymax'] = boxes[i][3]
-            entries.append(entry)  # Append entry to the list 
-        return pd.DataFrame(entries)
+        jpg_path = Path(jpg_path)
+        dataframe, key = self._from_cache(jpg_path)
+        if dataframe is not None:
+            return dataframe
+        image = label_processing.utils.load_jpg(str(jpg_path))
+        predictions = self._predict(image)
+        dataframe = self._prediction_to_dataframe(jpg_path, predictions)
+        self._to_cache(key, dataframe)
+        return dataframe
+
+    def _predict(self, image: np.ndarray) -> tuple:
+        """
+        Run the model on a single image, in tiles if it is larger than
+        tile_size.
+
+        Args:
+            image (np.ndarray): BGR image loaded by cv2.
+
+        Returns:
+            tuple: Labels, boxes in original image coordinates and scores.
+        """
+        image, factor = self._downsample(image)
+        if self.tile_size is not None and max(image.shape[:2]) > self.tile_size:
+            predictions = self._predict_tiled(image)
+        else:
+            predictions = self.model.predict(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return self._rescale_prediction(predictions, factor)
+
+    @staticmethod
+    def _tile_starts(length: int, tile_size: int, stride: int) -> list[int]:
+        """
+        Start positions of tiles covering one image axis.
+
+        Args:
+            length (int): Length of the image axis.
+            tile_size (int): Side length of the tiles.
+            stride (int): Distance between the starts of neighbouring tiles.
+
+        Returns:
+            list[int]: Start positions, the last tile ends at the image border.
+        """
+        starts = list(range(0, max(length - tile_size, 0) + 1, stride))
+        if starts[-1] + tile_size < length:
+            starts.append(length - tile_size)
+        return starts
+
+    def _predict_tiled(self, image: np.ndarray) -> tuple:
+        """
+        Run the model on overlapping tiles of an image and merge the boxes.
+
+        The tiles are views into the decoded image, only one tile at a time is
+        converted to RGB and to a tensor. Boxes with a score below the
+        threshold are dropped per tile, they would be removed by
+        clean_predictions anyway and cannot suppress a box above it. The
+        remaining boxes that are found in several tiles are merged with
+        merge_boxes.
+
+        Args:
+            image (np.ndarray): BGR image loaded by cv2.
+
+        Returns:
+            tuple: Labels, boxes in image coordinates and scores.
+        """
+        height, width = image.shape[:2]
+        stride = self.tile_size - self.tile_overlap
+        labels, boxes, scores = [], [], []
+        for y in self._tile_starts(height, self.tile_size, stride):
+            for x in self._tile_starts(width, self.tile_size, stride):
+                tile = cv2.cvtColor(image[y:y + self.tile_size,
+                                          x:x + self.tile_size],
+                                    cv2.COLOR_BGR2RGB)
+                tile_labels, tile_boxes, tile_scores = self.model.predict(tile)
+                keep = tile_scores >= self.threshold
+                labels.extend(label for label, kept in zip(tile_labels, keep.tolist())
+                              if kept)
+                boxes.append(tile_boxes[keep] + torch.tensor([x, y, x, y],
+                                                             dtype=tile_boxes.dtype))
+                scores.append(tile_scores[keep])
+        return merge_boxes(labels, torch.cat(boxes), torch.cat(scores))
+
+    def detect_and_crop(self, jpg_path: Path | str,
+                        crop_dir: Path | str) -> pd.DataFrame:
+        """
+        Predict labels for a JPG file and save the crops of all labels with a
+        score of at least the threshold, decoding the file only once.
+
+        Args:
+            jpg_path (Path|str): Path to the JPG file.
+            crop_dir (Path|str): Path where the crops should be saved.
+
+        Returns:
+            pd.DataFrame: Pandas DataFrame with the filtered prediction results.
+        """
+        jpg_path = Path(jpg_path)
+        image_raw = label_processing.utils.load_jpg(str(jpg_path))
+        dataframe, key = self._from_cache(jpg_path)
+        if dataframe is None:
+            predictions = self._predict(image_raw)
+            dataframe = self._prediction_to_dataframe(jpg_path, predictions)
+            self._to_cache(key, dataframe)
+        dataframe = dataframe.loc[dataframe['score'] >= self.threshold]
+        boxes = dataframe[COORDINATES].to_numpy()
+        crop_boxes(image_raw, boxes, crop_dir, jpg_path.stem)
+        return dataframe
+
+    def _read_batch(self, jpg_paths: list[Path]) -> tuple[list[torch.Tensor],
+                                                          list[float]]:
+        """
+        Decode a batch of JPG files into normalized image tensors.
+
+        Args:
+            jpg_paths (list[Path]): Paths to the JPG files.
+
+        Returns:
+            tuple[list[torch.Tensor], list[float]]: One tensor per image, ready
+                for the model, and the factors to rescale their boxes.
+        """
+        transform = detecto.utils.default_transforms()
+        images, factors = [], []
+        for jpg_path in jpg_paths:
+            image, factor = self._downsample(
+                label_processing.utils.load_jpg(str(jpg_path)))
+            images.append(transform(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+            factors.append(factor)
+        return images, factors
+
+    def predict_batch(self, jpg_paths: list[Path | str],
+                      batch_size: int = 4) -> pd.DataFrame:
+        """
+        Predict labels for several JPG files, batch_size images per model call.
+
+        The next batch is decoded in a background thread while the model runs
+        on the current one. Files found in the cache are not decoded at all.
+        With tiled inference the files are predicted one by one.
+
+        Args:
+            jpg_paths (list[Path|str]): Paths to the JPG files.
+            batch_size (int, optional): Number of images per model call.
+                Defaults to 4.
+
+        Returns:
+            pd.DataFrame: Pandas DataFrame with prediction results of all files.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size has to be at least 1")
+        jpg_paths = [Path(jpg_path) for jpg_path in jpg_paths]
+        if self.tile_size is not None:
+            frames = [self.class_prediction(jpg_path) for jpg_path in jpg_paths]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        frames: dict[int, pd.DataFrame] = {}
+        keys: dict[int, str | None] = {}
+        for index, jpg_path in enumerate(jpg_paths):
+            dataframe, keys[index] = self._from_cache(jpg_path)
+            if dataframe is not None:
+                frames[index] = dataframe
+        uncached = [index for index in range(len(jpg_paths)) if index not in frames]
+        batches = [uncached[i:i + batch_size]
+                   for i in range(0, len(uncached), batch_size)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as reader:
+            batch_paths = [[jpg_paths[index] for index in batch]
+                           for batch in batches]
+            next_images = reader.submit(self._read_batch, batch_paths[0]) \
+                if batches else None
+            for i, batch in enumerate(batches):
+                images, factors = next_images.result()
+                if i + 1 < len(batches):
+                    next_images = reader.submit(self._read_batch,
+                                                batch_paths[i + 1])
+                predictions = self.model.predict(images)
+                for index, prediction, factor in zip(batch, predictions,
+                                                     factors):
+                    prediction = self._rescale_prediction(prediction, factor)
+                    frames[index] = self._prediction_to_dataframe(
+                        jpg_paths[index], prediction)
+                    self._to_cache(keys[index], frames[index])
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat([frames[index] for index in sorted(frames)],
+                         ignore_index=True)
+
+
+def merge_boxes(labels: list[str], boxes: torch.Tensor, scores: torch.Tensor,
+                threshold: float = TILE_MERGE_THRESHOLD) -> tuple:
+    """
+    Non-maximum suppression for boxes predicted on overlapping tiles.
+
+    Boxes are visited by descending score; a box is dropped if a kept box of
+    the same class covers more than threshold of the smaller of both boxes.
+    Intersection over the smaller box (instead of IoU) also removes the cut
+    off part of a label that was found at the seam of a tile. Every kept box
+    is compared with the remaining boxes only, so the memory grows linearly
+    with the number of boxes.
+
+    Args:
+        labels (list[str]): Class of every box.
+        boxes (torch.Tensor): Boxes of shape (N, 4) in image coordinates.
+        scores (torch.Tensor): Scores of shape (N,).
+        threshold (float, optional): Overlap above which boxes are merged.
+            Defaults to TILE_MERGE_THRESHOLD.
+
+    Returns:
+        tuple: Labels, boxes and scores of the kept boxes.
+    """
+    order = torch.argsort(scores, descending=True)
+    boxes, scores = boxes[order], scores[order]
+    labels = [labels[i] for i in order.tolist()]
+    class_ids = {label: i for i, label in enumerate(dict.fromkeys(labels))}
+    label_ids = torch.tensor([class_ids[label] for label in labels], dtype=torch.long)
+    area = ((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).clamp(min=1e-6)
+    remaining = torch.arange(len(labels))
+    keep = []
+    while len(remaining):
+        i, remaining = remaining[0], remaining[1:]
+        keep.append(int(i))
+        top_left = torch.max(boxes[i, :2], boxes[remaining, :2])
+        bottom_right = torch.min(boxes[i, 2:], boxes[remaining, 2:])
+        intersection = (bottom_right - top_left).clamp(min=0).prod(dim=1)
+        overlap = intersection / torch.min(area[i], area[remaining])
+        suppressed = (overlap > threshold) & (label_ids[remaining] == label_ids[i])
+        remaining = remaining[~suppressed]
+    return [labels[i] for i in keep], boxes[keep], scores[keep]
+
+
+# Predictor owned by a worker process, set once by _init_worker
+_worker_predictor: PredictLabel | None = None
+
+
+def _init_worker(path_to_model: str, classes: list, n_threads: int,
+                 options: dict) -> None:
+    """
+    Initializer for the worker processes of prediction_parallel.
+
+    Loads the model once per process from its path and pins the number of
+    torch threads, so that the workers do not oversubscribe the cores. The
+    cache of the worker is closed when the process exits, which writes the
+    access times of its cache hits.
+
+    Args:
+        path_to_model (str): Path to the model.
+        classes (list): List of classes.
+        n_threads (int): Number of torch threads used by the worker.
+        options (dict): Further keyword arguments for PredictLabel.
+    """
+    global _worker_predictor
+    torch.set_num_threads(n_threads)
+    _worker_predictor = PredictLabel(path_to_model, classes, **options)
+    if _worker_predictor.cache is not None:
+        multiprocessing.util.Finalize(None, _worker_predictor.cache.close,
+                                      exitpriority=10)
+
+
+def _worker_prediction(jpg_paths: list[Path], batch_size: int) -> pd.DataFrame:
+    """
+    Predict labels for several batches of JPG files with the model loaded by
+    _init_worker.
+
+    Args:
+        jpg_paths (list[Path]): Paths to the JPG files.
+        batch_size (int): Number of images per model call.
+
+    Returns:
+        pd.DataFrame: Pandas DataFrame with prediction results.
+    """
+    return _worker_predictor.predict_batch(jpg_paths, batch_size)
+
+
+def _pickled_prediction(predictor: PredictLabel, jpg_paths: list[Path],
+                        batch_size: int) -> pd.DataFrame:
+    """
+    Predict labels for JPG files with a predictor pickled along with the task.
+
+    The cache of the pickled predictor only lives for this task, so it is
+    closed afterwards to write the access times of its cache hits.
+
+    Args:
+        predictor (PredictLabel): Prediction instance.
+        jpg_paths (list[Path]): Paths to the JPG files.
+        batch_size (int): Number of images per model call.
+
+    Returns:
+        pd.DataFrame: Pandas DataFrame with prediction results.
+    """
+    try:
+        return predictor.predict_batch(jpg_paths, batch_size)
+    finally:
+        if predictor.cache is not None:
+            predictor.cache.close()
+
+
+def _worker_detect_and_crop(jpg_path: Path, crop_dir: Path) -> pd.DataFrame:
+    """
+    Predict and crop labels of a JPG file with the model loaded by _init_worker.
+
+    Args:
+        jpg_path (Path): Path to the JPG file.
+        crop_dir (Path): Path where the crops should be saved.
+
+    Returns:
+        pd.DataFrame: Pandas DataFrame with the filtered prediction results.
+    """
+    return _worker_predictor.detect_and_crop(jpg_path, crop_dir)
+
+
+def _worker_initargs(predictor: PredictLabel, n_processes: int) -> tuple:
+    """
+    Arguments for _init_worker to rebuild a predictor in a worker process.
+
+    Args:
+        predictor (PredictLabel): Prediction instance.
+        n_processes (int): Number of processes for parallel execution.
+
+    Returns:
+        tuple: Arguments for _init_worker.
+    """
+    n_threads = max(1, (os.cpu_count() or 1) // n_processes)
+    options = {'threshold': predictor.threshold,
+               'inference_max_side': predictor.inference_max_side,
+               'backend': predictor.backend,
+               'cache': predictor.cache,
+               'tile_size': predictor.tile_size,
+               'tile_overlap': predictor.tile_overlap}
+    return (str(predictor.path_to_model), predictor.classes, n_threads, options)
+
+
+#---------------------Progress Journal---------------------#
+
+
+class PredictionJournal(JsonlJournal):
+    """
+    Progress journal of prediction_parallel with one line per finished JPG
+    file, so that an interrupted prediction run can be resumed.
+
+    Attributes:
+        path (Path): Path to the journal file.
+    """
+
+    def load(self) -> dict[str, pd.DataFrame]:
+        """
+        Read the predictions of all journaled JPG files. A line that was cut
+        off by an interruption is ignored.
+
+        Returns:
+            dict[str, pd.DataFrame]: Predictions per JPG filename.
+        """
+        return {entry['filename']: _predictions_from_dict(entry['filename'],
+                                                          entry['predictions'])
+                for entry in self.entries()}
+
+    def write(self, filename: str, dataframe: pd.DataFrame) -> None:
+        """
+        Append the predictions of a finished JPG file.
+
+        Args:
+            filename (str): Name of the JPG file.
+            dataframe (pd.DataFrame): Pandas DataFrame with its predictions.
+        """
+        self.write_entry({'filename': filename,
+                          'predictions': _predictions_to_dict(dataframe)})
+        self.flush()
 
 
 def prediction_parallel(jpg_dir: Path | str, predictor: PredictLabel,
-                        n_processes: int) -> pd.DataFrame:
+                        n_processes: int,
+                        load_per_worker: bool = True,
+                        batch_size: int = 1,
+                        journal_path: Path | str | None = None,
+                        resume: bool = False) -> pd.DataFrame:
     """
     Perform predictions for all JPG files in a directory with parallel processing.
 
+    By default every worker process loads the model once from
+    predictor.path_to_model, runs torch with cores/n_processes threads and
+    only receives file paths. With load_per_worker set to False the
+    predictor itself is pickled and sent along with every task. Every task
+    holds up to BATCHES_PER_TASK batches, so that the worker decodes the
+    next batch while the model runs on the current one. The size limit of
+    predictor.cache is checked once all workers have finished.
+
+    With a journal_path the predictions of every finished JPG file are
+    appended to a PredictionJournal right away; with resume the files that
+    are already in the journal are skipped.
+
     Args:
         jpg_dir (Path|str): Path to JPG files for prediction.
         predictor (PredictLabel): Prediction instance.
         n_processes (int): Number of processes for parallel execution.
+        load_per_worker (bool, optional): Load the model once in every worker
+            process. Defaults to True.
+        batch_size (int, optional): Number of images per model call.
+            Defaults to 1.
+        journal_path (Path|str|None, optional): Path to the journal file.
+            Defaults to None (no journal).
+        resume (bool, optional): Skip the JPG files found in the journal.
+            Defaults to False.
 
     Returns:
         pd.DataFrame: Pandas DataFrame containing the predictions.
@@ -133,15 +745,142 @@ def prediction_parallel(jpg_dir: Path | str, predictor: PredictLabel,
         jpg_dir = Path(jpg_dir)
 
     file_names: list[Path] = list(jpg_dir.glob("*.jpg"))
-    with concurrent.futures.ProcessPoolExecutor(max_workers=n_processes) as executor:
-        results = executor.map(predictor.class_prediction, file_names)
+    journal = PredictionJournal(journal_path) if journal_path else None
+    frames = journal.load() if journal and resume else {}
+    if frames:
+        print(f"\nResuming: {len(frames)} files have already been predicted")
+    todo = [file_name for file_name in file_names if file_name.name not in frames]
+    # fewer batches per task if there would be fewer tasks than processes
+    chunk_size = max(batch_size, min(batch_size * BATCHES_PER_TASK,
+                                     math.ceil(len(todo) / n_processes)))
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
 
-    final_results = []
-    # merge list of lists to single list
-    map(final_results.extend, results)
+    if load_per_worker:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_processes, initializer=_init_worker,
+            initargs=_worker_initargs(predictor, n_processes))
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=n_processes)
+    with executor:
+        if load_per_worker:
+            futures = {executor.submit(_worker_prediction, chunk, batch_size): chunk
+                       for chunk in chunks}
+        else:
+            futures = {executor.submit(_pickled_prediction, predictor, chunk,
+                                       batch_size): chunk
+                       for chunk in chunks}
+        if journal:
+            journal.open(resume=resume)
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                dataframe = future.result()
+                for file_name in futures[future]:
+                    frame = dataframe[dataframe.filename == file_name.name] \
+                        if len(dataframe) else dataframe
+                    frames[file_name.name] = frame
+                    if journal:
+                        journal.write(file_name.name, frame)
+        finally:
+            if journal:
+                journal.close()
+    # every worker only evicts after its own insertions, check the size
+    # limit of the whole run once the workers have finished
+    if predictor.cache is not None:
+        predictor.cache.evict()
+
+    results = [frames[file_name.name] for file_name in file_names
+               if file_name.name in frames]
+    if not results:
+        return pd.DataFrame()
     return pd.concat(results, ignore_index=True)
 
 
+def prediction_streaming(jpg_dir: Path | str, predictor: PredictLabel,
+                         n_processes: int,
+                         out_dir: Path | str | None = None,
+                         journal_path: Path | str | None = None,
+                         resume: bool = False) -> pd.DataFrame:
+    """
+    Detect and crop the labels of all JPG files in a directory in one pass.
+
+    Every worker decodes a picture once, predicts its labels, keeps the ones
+    with a score of at least predictor.threshold and saves their crops right
+    away. The predictions csv is appended as soon as a picture is finished;
+    it has the same columns (and a running index) as the csv of
+    clean_predictions.
+
+    With a journal_path the filtered predictions of every picture are
+    appended to a PredictionJournal once its crops are saved; with resume
+    the pictures found there are not predicted again and their rows are
+    written to the csv first.
+
+    Args:
+        jpg_dir (Path|str): Path to JPG files for prediction.
+        predictor (PredictLabel): Prediction instance.
+        n_processes (int): Number of processes for parallel execution.
+        out_dir (Path|str|None, optional): Output directory for the csv file and
+            the crops. Defaults to the parent of jpg_dir.
+        journal_path (Path|str|None, optional): Path to the journal file.
+            Defaults to None (no journal).
+        resume (bool, optional): Skip the JPG files found in the journal.
+            Defaults to False.
+
+    Returns:
+        pd.DataFrame: Pandas DataFrame with the filtered predictions.
+    """
+    jpg_dir = Path(jpg_dir)
+    out_dir = jpg_dir.resolve().parent if out_dir is None else Path(out_dir)
+    crop_dir = out_dir.joinpath(f"{jpg_dir.name}_cropped")
+    crop_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = out_dir.joinpath(f"{jpg_dir.stem}_predictions.csv")
+
+    journal = PredictionJournal(journal_path) if journal_path else None
+    journaled = journal.load() if journal and resume else {}
+    if journaled:
+        print(f"\nResuming: {len(journaled)} files have already been cropped")
+    todo = [file_name for file_name in jpg_dir.glob("*.jpg")
+            if file_name.name not in journaled]
+
+    frames = []
+    rows = 0
+
+    def write_rows(dataframe: pd.DataFrame) -> None:
+        nonlocal rows
+        # continue the index of the previous pictures like clean_predictions
+        dataframe = dataframe.set_axis(pd.RangeIndex(rows, rows + len(dataframe)))
+        dataframe.to_csv(csv_file, header=not frames)
+        csv_file.flush()
+        rows += len(dataframe)
+        frames.append(dataframe)
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_processes, initializer=_init_worker,
+            initargs=_worker_initargs(predictor, n_processes)) as executor, \
+            open(csv_path, "w", newline="", encoding="utf8") as csv_file:
+        for dataframe in journaled.values():
+            write_rows(dataframe)
+        futures = {executor.submit(_worker_detect_and_crop, file_name, crop_dir): file_name
+                   for file_name in todo}
+        if journal:
+            journal.open(resume=resume)
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                dataframe = future.result()
+                if journal:
+                    journal.write(futures[future].name, dataframe)
+                write_rows(dataframe)
+        finally:
+            if journal:
+                journal.close()
+    if predictor.cache is not None:
+        predictor.cache.evict()
+    print(f"\nThe csv_file {csv_path.name} has been successfully saved in {out_dir}")
+    print(f"\nThe images have been successfully saved in {crop_dir}")
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
 def clean_predictions(jpg_dir: Path, dataframe: pd.DataFrame,
                       threshold: float, out_dir=None) -> pd.DataFrame:
     """
@@ -157,13 +896,9 @@ def clean_predictions(jpg_dir: Path, dataframe: pd.DataFrame,
         pd.DataFrame: Pandas DataFrame with filtered results.
     """
     print("\nFilter coordinates")
-    colnames = ['score', 'xmin', 'ymin', 'xmax', 'ymax']
-    for header in colnames:
-        dataframe[header] = dataframe[header].astype('str').str.\
-            extractall('(\d+.\d+)').unstack().fillna('').sum(axis=1).astype(float)
-    dataframe = dataframe.loc[dataframe['score'] >= threshold]
+    dataframe = dataframe.loc[dataframe['score'] >= threshold].copy()
     dataframe[['xmin', 'ymin','xmax','ymax']] = \
-        dataframe[['xmin', 'ymin','xmax','ymax']].fillna('0')
+        dataframe[['xmin', 'ymin','xmax','ymax']].fillna(0)
     if out_dir is None:
         parent_dir = jpg_dir.resolve().parent  #get parent of jpg_dir
     else:
@@ -198,34 +933,71 @@ def crop_picture(img_raw: np.ndarray, path: str,
     cv2.imwrite(filepath, crop)
 
 
+def crop_boxes(img_raw: np.ndarray, boxes: np.ndarray, path: str | Path,
+               label_id: str) -> None:
+    """
+    Crop all predicted boxes of one picture and save them as
+    <label_id>_<occurrence>.jpg.
+
+    Args:
+        img_raw (numpy.ndarray): Input JPG converted to a numpy matrix by cv2.
+        boxes (numpy.ndarray): Array of shape (N, 4) with xmin, ymin, xmax and
+            ymax of every box.
+        path (str|Path): Path where the crops should be saved.
+        label_id (str): Name of the picture without extension.
+    """
+    for occ, (xmin, ymin, xmax, ymax) in enumerate(boxes.astype(int), start=1):
+        crop_picture(img_raw, path, f"{label_id}_{occ}.jpg", xmin=xmin,
+                     ymin=ymin, xmax=xmax, ymax=ymax)
+
+
+def _crop_file(filepath: Path, boxes: np.ndarray, path: Path) -> None:
+    """
+    Load a picture and save the crops of all its boxes.
+
+    Args:
+        filepath (Path): Path to the JPG file.
+        boxes (numpy.ndarray): Array of shape (N, 4) with the box coordinates.
+        path (Path): Path where the crops should be saved.
+    """
+    image_raw = label_processing.utils.load_jpg(str(filepath))
+    crop_boxes(image_raw, boxes, path, filepath.stem)
+
+
 def create_crops(jpg_dir: Path, dataframe: pd.DataFrame,
-                 out_dir: Path = Path(os.getcwd())) -> None:
+                 out_dir: Path = Path(os.getcwd()),
+                 n_threads: int = CROP_THREADS) -> None:
     """
     Creates crops by using the csv from applying the model and the original
     pictures inside a directory.
 
+    The predictions are grouped by filename in a single pass, so only pictures
+    with at least one box are loaded. Loading and saving run in a thread pool
+    since cv2 releases the GIL for both; every thread holds one decoded full
+    resolution picture, so n_threads also bounds the memory.
+
     Args:
         jpg_dir (): path to directory with jpgs.
         dataframe (str): path to csv file.
         out_dir (Path): path to the target directory to save the cropped jpgs.
+        n_threads (int, optional): Number of threads for loading and saving
+            the pictures. Defaults to CROP_THREADS.
     """
-    dir_path = jpg_dir
+    dir_path = Path(jpg_dir)
     out_dir = Path(out_dir)
     new_dir_name = Path(dir_path.name + "_cropped")
     path = out_dir.joinpath(new_dir_name)
     path.mkdir(parents=True, exist_ok=True)
-    
-    for filepath in glob.glob(os.path.join(dir_path, '*.jpg')):
-        filename = os.path.basename(filepath)
-        match = dataframe[dataframe.filename == filename]
-        image_raw = label_processing.utils.load_jpg(filepath)
-        label_id = Path(filename).stem
-        label_occ = []
-        for _, row in match.iterrows():
-            occ = label_occ.count(label_id) + 1
-            filename = f"{label_id}_{occ}.jpg"
-            coordinates = {'xmin': int(row.xmin), 'ymin': int(row.ymin),
-                           'xmax': int(row.xmax), 'ymax': int(row.ymax)}
-            crop_picture(image_raw, path, filename, **coordinates)
-            label_occ.append(label_id)
-    print(f"\nThe images have been successfully saved in {path}")
\ No newline at end of file
+
+    groups = dataframe.groupby('filename', sort=False) if len(dataframe) else []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_threads) as executor:
+        futures = []
+        for filename, match in groups:
+            filepath = dir_path.joinpath(filename)
+            if not filepath.is_file():
+                continue
+            boxes = match[COORDINATES].to_numpy()
+            futures.append(executor.submit(_crop_file, filepath, boxes, path))
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    print(f"\nThe images have been successfully saved in {path}")
@@ -0,0 +1,172 @@
+# Import third-party libraries
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MAX_SIZE_MB = 1024
+EVICTION_INTERVAL = 100 #number of insertions between two size checks
+ACCESS_FLUSH_INTERVAL = 100 #number of cache hits between two writes of their access times
+
+
+#---------------------SQLite Result Cache---------------------#
+
+
+class ResultCache():
+    """
+    Persistent key-value cache for expensive results (model predictions, API
+    responses), stored in a SQLite file.
+
+    The cache is bounded by the total size of the stored values; when it grows
+    beyond max_size_mb the least recently used entries are removed. The
+    access times of cache hits are collected in memory and written in one
+    transaction every ACCESS_FLUSH_INTERVAL hits, before an eviction and on
+    close, so that lookups from several processes rarely wait for the write
+    lock. The connection is opened lazily, so instances can be pickled and sent to
+    worker processes, which then open their own connection. Within a process
+    one instance can be shared by several threads.
+
+    Attributes:
+        path (Path): Path to the SQLite file.
+        max_size_mb (float): Maximal size of all stored values in megabytes.
+    """
+
+    def __init__(self, path: str | Path,
+                 max_size_mb: float = DEFAULT_MAX_SIZE_MB) -> None:
+        """
+        Init Method for the ResultCache Class.
+
+        Args:
+            path (str|Path): Path to the SQLite file, created if missing.
+            max_size_mb (float, optional): Maximal size of all stored values in
+                megabytes. Defaults to DEFAULT_MAX_SIZE_MB.
+        """
+        self.path = Path(path)
+        self.max_size_mb = max_size_mb
+        self._connection: Optional[sqlite3.Connection] = None
+        self._insertions = 0
+        self._accessed: dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_accessed'] = {}
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """sqlite3.Connection: Connection to the cache, opened on first use."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # access from several threads is serialized by self._lock
+            connection = sqlite3.connect(self.path, timeout=60,
+                                         check_same_thread=False)
+            # WAL lets several worker processes read while one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache ("
+                               "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                               "size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed "
+                               "ON cache (accessed)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a value and mark it as recently used.
+
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            Optional[str]: The stored value or None if the key is not cached.
+        """
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM cache WHERE key = ?",
+                                          (key,)).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_INTERVAL:
+                self.flush_access_times()
+        return row[0]
+
+    def flush_access_times(self) -> None:
+        """
+        Write the collected access times of cache hits in one transaction.
+        """
+        with self._lock:
+            if not self._accessed:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE cache SET accessed = ? WHERE key = ?",
+                    [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def put(self, key: str, value: str) -> None:
+        """
+        Store a value, replacing an existing entry with the same key.
+
+        Args:
+            key (str): Key of the entry.
+            value (str): Value to store.
+        """
+        with self._lock:
+            self._accessed.pop(key, None)
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf8")), time.time()))
+            self._insertions += 1
+            if self._insertions % EVICTION_INTERVAL == 0:
+                self.evict()
+
+    def size(self) -> int:
+        """
+        Get the total size of the cache.
+
+        Returns:
+            int: Total size of all stored values in bytes.
+        """
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the stored values fit
+        into max_size_mb.
+        """
+        with self._lock:
+            self.flush_access_times()
+            excess = self.size() - self.max_size_mb * 1e6
+            if excess <= 0:
+                return
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM (SELECT key, size, SUM(size) OVER "
+                    "(ORDER BY accessed, key) AS freed FROM cache) "
+                    "WHERE freed - size < ?)", (excess,))
+
+    def close(self) -> None:
+        """
+        Check the size limit and close the connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self.evict()
+                self._connection.close()
+                self._connection = None
@@ -3,6 +3,8 @@ import numpy as np
 import pandas as pd
 import cv2
 import glob, os
+import shutil
+import concurrent.futures
 from pathlib import Path
 import tensorflow as tf
 from tensorflow import keras
@@ -14,6 +16,13 @@ from label_processing import utils
 # Suppress warning messages during execution
 warnings.filterwarnings('ignore')
 
+IMG_HEIGHT = 180
+IMG_WIDTH = 180
+BATCH_SIZE = 64 #images per model call
+SORT_MODES = ("reflink", "hardlink", "copy", "reencode")
+SORT_WORKERS = 8 #threads copying the pictures into the class directories
+FICLONE = 0x40049409 #Linux ioctl that shares the data blocks of two files
+
 
 #--------------------------------Predict Classes--------------------------------#
 
@@ -32,7 +41,97 @@ def get_model(path_to_model: str) -> tf.keras.Sequential:
     model = tf.keras.models.load_model(path_to_model)
     return model
 
-def class_prediction(model: tf.keras.Sequential, class_names: list, jpg_dir: str, out_dir=None) -> pd.DataFrame:
+def load_image(file: tf.Tensor, img_height: int = IMG_HEIGHT, img_width: int = IMG_WIDTH) -> tf.Tensor:
+    """
+    Read, decode and resize one picture inside the tf.data pipeline, like
+    tf.keras.utils.load_img with a target size (RGB, nearest neighbour).
+
+    Args:
+        file (tf.Tensor): Path to the picture as string tensor.
+        img_height (int, optional): Height expected by the model. Defaults to IMG_HEIGHT.
+        img_width (int, optional): Width expected by the model. Defaults to IMG_WIDTH.
+
+    Returns:
+        tf.Tensor: Float32 image tensor of shape (img_height, img_width, 3).
+    """
+    image = tf.io.decode_image(tf.io.read_file(file), channels=3,
+                               expand_animations=False)
+    image = tf.image.resize(image, (img_height, img_width), method="nearest")
+    return tf.cast(image, tf.float32)
+
+def make_dataset(files: list[str], batch_size: int = BATCH_SIZE,
+                 img_height: int = IMG_HEIGHT, img_width: int = IMG_WIDTH) -> tf.data.Dataset:
+    """
+    Create a tf.data pipeline that decodes and resizes the pictures in
+    parallel and prepares the next batches while the model is running.
+
+    Args:
+        files (list[str]): Paths to the pictures.
+        batch_size (int, optional): Number of pictures per batch. Defaults to BATCH_SIZE.
+        img_height (int, optional): Height expected by the model. Defaults to IMG_HEIGHT.
+        img_width (int, optional): Width expected by the model. Defaults to IMG_WIDTH.
+
+    Returns:
+        tf.data.Dataset: Batches of image tensors in the order of files.
+    """
+    dataset = tf.data.Dataset.from_tensor_slices(files)
+    dataset = dataset.map(lambda file: load_image(file, img_height, img_width),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def predict_probabilities(model: tf.keras.Sequential, dataset: tf.data.Dataset) -> np.ndarray:
+    """
+    Apply the model to every batch of the dataset with one call per batch.
+
+    Args:
+        model (tf.keras.Sequential): Trained Keras Sequential image classifier model.
+        dataset (tf.data.Dataset): Batches created by make_dataset.
+
+    Returns:
+        np.ndarray: Softmax probabilities of shape (number of pictures, number of classes).
+    """
+    return predict_probabilities_multi([model], dataset)[0]
+
+def predict_probabilities_multi(models: list[tf.keras.Sequential],
+                                dataset: tf.data.Dataset) -> list[np.ndarray]:
+    """
+    Apply several models to every batch of the dataset, so that each picture
+    is decoded and resized only once.
+
+    Args:
+        models (list[tf.keras.Sequential]): Trained Keras Sequential image classifier models.
+        dataset (tf.data.Dataset): Batches created by make_dataset.
+
+    Returns:
+        list[np.ndarray]: Softmax probabilities of every model, each of shape
+            (number of pictures, number of classes).
+    """
+    logits = [[] for _ in models]
+    for batch in dataset:
+        # calling the model directly avoids the per-call overhead of model.predict
+        for model_logits, model in zip(logits, models):
+            model_logits.append(model(batch, training=False))
+    # an empty dataset gives (0, number of classes), so that argmax over axis 1 works
+    return [tf.nn.softmax(tf.concat(model_logits, axis=0), axis=-1).numpy()
+            if model_logits else np.empty((0, model.output_shape[-1]), dtype=np.float32)
+            for model_logits, model in zip(logits, models)]
+
+def probabilities_to_classes(probabilities: np.ndarray, class_names: list) -> tuple[list, np.ndarray]:
+    """
+    Select the most probable class of every picture.
+
+    Args:
+        probabilities (np.ndarray): Softmax probabilities returned by predict_probabilities.
+        class_names (list): Model's predicted classes.
+
+    Returns:
+        tuple[list, np.ndarray]: Class names and scores (in percent) of the pictures.
+    """
+    classes = [class_names[index] for index in np.argmax(probabilities, axis=1)]
+    return classes, 100 * np.max(probabilities, axis=1)
+
+def class_prediction(model: tf.keras.Sequential, class_names: list, jpg_dir: str, out_dir=None,
+                     batch_size: int = BATCH_SIZE) -> pd.DataFrame:
     """
     Create a dataframe with predicted classes for each picture.
 
@@ -41,27 +140,20 @@ def class_prediction(model: tf.keras.Sequential, class_names: list, jpg_dir: str
         class_names (list): Model's predicted classes.
         jpg_dir (str): Path to the directory containing the original jpgs.
         out_dir (str): Path where the CSV file will be stored.
+        batch_size (int, optional): Number of pictures per model call. Defaults to BATCH_SIZE.
 
     Returns:
         DataFrame (pd.DataFrame): Pandas DataFrame with the predicted results.
     """
     utils.check_dir(jpg_dir)
     print("\nPredicting classes")
-    all_predictions = []
-    img_width = 180
-    img_height = 180
-    for file in glob.glob(f"{jpg_dir}/*.jpg"):
-        image = tf.keras.utils.load_img(file, target_size=(img_height, img_width))
-        img_array = tf.keras.utils.img_to_array(image)
-        img_array = tf.expand_dims(img_array, 0) # Create a batch
-        predictions = model.predict(img_array)
-        score = tf.nn.softmax(predictions[0])
-        entry = {}
-        entry['filename'] = os.path.basename(file) # Get the filename without the directory
-        entry['class'] = class_names[np.argmax(score)]
-        entry['score'] = 100 * np.max(score)
-        all_predictions.append(entry)
-    df = pd.DataFrame(all_predictions)
+    files = glob.glob(f"{jpg_dir}/*.jpg")
+    probabilities = predict_probabilities(model, make_dataset(files, batch_size))
+    classes, scores = probabilities_to_classes(probabilities, class_names)
+    df = pd.DataFrame({
+        'filename': [os.path.basename(file) for file in files], # Get the filename without the directory
+        'class': classes,
+        'score': scores})
     if out_dir is None:
         out_dir = os.path.dirname(os.path.realpath(jpg_dir))
     filename = f"{Path(jpg_dir).stem}_prediction_classifer.csv"
@@ -71,6 +163,41 @@ def class_prediction(model: tf.keras.Sequential, class_names: list, jpg_dir: str
     return df
 
 
+def multi_class_prediction(models: dict[str, tf.keras.Sequential], class_names: dict[str, list],
+                           jpg_dir: str, out_dir=None, batch_size: int = BATCH_SIZE) -> pd.DataFrame:
+    """
+    Create one dataframe with the predicted classes of several models for
+    each picture. Every batch is decoded once and passed to all models.
+
+    Args:
+        models (dict[str, tf.keras.Sequential]): Trained models by name, the
+            names are used as column prefixes.
+        class_names (dict[str, list]): Predicted classes of every model by name.
+        jpg_dir (str): Path to the directory containing the original jpgs.
+        out_dir (str): Path where the CSV file will be stored.
+        batch_size (int, optional): Number of pictures per model call. Defaults to BATCH_SIZE.
+
+    Returns:
+        DataFrame (pd.DataFrame): Pandas DataFrame with a filename column and
+            a <name>_class and <name>_score column per model.
+    """
+    utils.check_dir(jpg_dir)
+    print("\nPredicting classes")
+    files = glob.glob(f"{jpg_dir}/*.jpg")
+    all_probabilities = predict_probabilities_multi(list(models.values()),
+                                                    make_dataset(files, batch_size))
+    df = pd.DataFrame({'filename': [os.path.basename(file) for file in files]})
+    for name, probabilities in zip(models, all_probabilities):
+        df[f"{name}_class"], df[f"{name}_score"] = probabilities_to_classes(
+            probabilities, class_names[name])
+    if out_dir is None:
+        out_dir = os.path.dirname(os.path.realpath(jpg_dir))
+    filename = f"{Path(jpg_dir).stem}_prediction_classifiers.csv"
+    df.to_csv(f"{out_dir}/{filename}")
+    print(f"\nThe CSV file {filename} has been successfully saved in {out_dir}")
+    return df
+
+
 #--------------------------------Save Pictures--------------------------------#
 
 
@@ -113,24 +240,92 @@ def rename_picture(img_raw: np.ndarray , path: str, filename: str, pic_class: st
     filepath = f"{path}/{pic_class}/{filename}"
     cv2.imwrite(filepath, img_raw)
 
-def filter_pictures(jpg_dir: Path, dataframe: pd.DataFrame, out_dir: Path = Path(os.getcwd())) -> None:
+def reflink(src: str, dst: str) -> None:
+    """
+    Create dst as copy-on-write clone of src, which needs no additional disk
+    space or data copy (Linux, on file systems like Btrfs or XFS).
+
+    Args:
+        src (str): Path to the original file.
+        dst (str): Path to the clone.
+
+    Raises:
+        OSError: raised if the platform or file system does not support reflinks.
+    """
+    # imported here, fcntl is not available on Windows
+    import fcntl
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        try:
+            fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+        except OSError:
+            f_dst.close()
+            os.remove(dst)
+            raise
+
+def sort_picture(filepath: str, dst: str, mode: str = "reflink") -> None:
+    """
+    Place the original bytes of a picture at dst without decoding it.
+
+    'reflink' and 'hardlink' fall back to a byte copy if the file system does
+    not support them (or src and dst are on different devices).
+
+    Args:
+        filepath (str): Path to the original jpg.
+        dst (str): Target path in the class directory.
+        mode (str, optional): 'reflink', 'hardlink' or 'copy'. Defaults to 'reflink'.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        if mode == "reflink":
+            reflink(filepath, dst)
+            return
+        if mode == "hardlink":
+            os.link(filepath, dst)
+            return
+    except OSError:
+        pass
+    shutil.copyfile(filepath, dst)
+
+def filter_pictures(jpg_dir: Path, dataframe: pd.DataFrame, out_dir: Path = Path(os.getcwd()),
+                    mode: str = "reflink", workers: int = SORT_WORKERS) -> None:
     """
     Create new folders for each class of the newly named classified pictures.
 
+    By default the original files are placed in the class folders without
+    decoding and re-encoding them (see sort_picture); 'reencode' writes the
+    pictures with cv2.imwrite instead.
+
     Args:
         jpg_dir (str): Path to directory with jpgs.
         dataframe (pd.DataFrame): Pandas DataFrame with class predictions.
         out_dir (Path): Path to the target directory to save the cropped jpgs.
+        mode (str, optional): One of SORT_MODES. Defaults to 'reflink'.
+        workers (int, optional): Number of threads placing the files. Defaults to SORT_WORKERS.
     """
+    if mode not in SORT_MODES:
+        raise ValueError(f"mode has to be one of {SORT_MODES}")
     create_dirs(dataframe, out_dir)  # Create directories for every class
 
-    for filepath in glob.glob(os.path.join(jpg_dir, '*.jpg')):
+    # classes of every file, looked up once per file
+    classes: dict[str, list[str]] = {}
+    for filename, pic_class in zip(dataframe["filename"], dataframe["class"]):
+        classes.setdefault(filename, []).append(pic_class)
+
+    def place(filepath: str) -> None:
         filename = os.path.basename(filepath)
-        match = dataframe[dataframe.filename == filename]
-        image_raw = utils.load_jpg(filepath)
         label_id = Path(filename).stem
-        for _, row in match.iterrows():
-            pic_class = row['class']
-            filename = make_file_name(label_id, pic_class)
-            rename_picture(image_raw, out_dir, filename, pic_class)
+        pic_classes = classes.get(filename, [])
+        if mode == "reencode" and pic_classes:
+            image_raw = utils.load_jpg(filepath)
+            for pic_class in pic_classes:
+                rename_picture(image_raw, out_dir, make_file_name(label_id, pic_class), pic_class)
+            return
+        for pic_class in pic_classes:
+            dst = os.path.join(out_dir, pic_class, make_file_name(label_id, pic_class))
+            sort_picture(filepath, dst, mode)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() raises the errors of the threads
+        list(executor.map(place, glob.glob(os.path.join(jpg_dir, '*.jpg'))))
     print(f"\nThe images have been successfully saved in {out_dir}")
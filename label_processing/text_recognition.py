@@ -5,9 +5,10 @@ import copy
 import cv2
 import shutil
 import math
+import time
 import pytesseract as py
 import numpy as np
-from typing import  Union, Tuple, Optional
+from typing import  Union, Tuple, Optional, Callable, Iterator
 from deskew import determine_skew
 from enum import Enum
 from pathlib import Path
@@ -22,8 +23,15 @@ warnings.filterwarnings('ignore')
 #Configurations
 CONFIG = r'--psm 6 --oem 3' #configuration for OCR
 LANGUAGES = 'eng+deu+fra+ita+spa+por' #specifying languages used for OCR
+TESSERACT_BACKENDS = ("pytesseract", "api") #subprocess per image or in-process engine
+FIRST_PASS_LANGUAGES = 'eng' #languages of the cheap first pass in two-pass mode
+MIN_CONFIDENCE = 70 #mean word confidence (0-100) to accept a first pass result
+ADAPTIVE_MODES = ("OTSU", "ADAPTIVE_MEAN", "ADAPTIVE_GAUSSIAN") #order of the thresholding retries
 MIN_SKEW_ANGLE = -10
 MAX_SKEW_ANGLE = 10
+FAST_SKEW_MAX_SIDE = 512 #longest side of the image used by estimate_skew
+QR_PREFILTER_MAX_SIDE = 512 #longest side of the image used by has_qr_candidate
+QR_FINDER_PATTERNS = 3 #number of finder patterns of a QR code
 
 def find_tesseract() -> None:
     """
@@ -37,6 +45,150 @@ def find_tesseract() -> None:
         py.pytesseract.tesseract_cmd = tesseract_path
 
 
+#---------------------Skew Estimation---------------------#
+
+
+def estimate_skew(grayscale: np.ndarray, max_side: int = FAST_SKEW_MAX_SIDE,
+                  coarse_step: float = 1.0,
+                  fine_step: float = 0.1) -> Optional[float]:
+    """
+    Fast alternative to deskew.determine_skew using projection profiles.
+
+    The image is downscaled to max_side and binarized with Otsu's method. For
+    every candidate angle the text pixels are projected onto the rotated
+    vertical axis; the angle with the sharpest row histogram (highest sum of
+    squared counts) aligns the text lines. The angle is searched in steps of
+    coarse_step between MIN_SKEW_ANGLE and MAX_SKEW_ANGLE and then refined in
+    steps of fine_step around the best coarse angle.
+
+    Args:
+        grayscale (np.ndarray): Grayscale image.
+        max_side (int, optional): Longest side of the downscaled image.
+            Defaults to FAST_SKEW_MAX_SIDE.
+        coarse_step (float, optional): Step of the coarse search in degrees.
+            Defaults to 1.0.
+        fine_step (float, optional): Step of the fine search in degrees.
+            Defaults to 0.1.
+
+    Returns:
+        Optional[float]: The skew angle in degrees, with the same sign
+            convention as determine_skew, or None for an empty image.
+    """
+    factor = max_side / max(grayscale.shape[:2])
+    if factor < 1:
+        grayscale = cv2.resize(grayscale, None, fx=factor, fy=factor,
+                               interpolation=cv2.INTER_AREA)
+    binary = cv2.threshold(grayscale, 0, 255,
+                           cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    rows, cols = np.nonzero(binary)
+    # text is the minority of the pixels, also on dark backgrounds
+    if len(rows) > binary.size / 2:
+        rows, cols = np.nonzero(binary == 0)
+    if len(rows) == 0:
+        return None
+    rows = rows - rows.mean()
+    cols = cols - cols.mean()
+
+    def profile_score(angle: float) -> float:
+        radian = math.radians(angle)
+        # row coordinate after cv2.getRotationMatrix2D(center, angle, 1.0)
+        projected = np.rint(rows * math.cos(radian)
+                            - cols * math.sin(radian)).astype(np.int64)
+        counts = np.bincount(projected - projected.min())
+        return float(np.dot(counts, counts))
+
+    coarse = np.arange(MIN_SKEW_ANGLE, MAX_SKEW_ANGLE + coarse_step / 2,
+                       coarse_step)
+    best = max(coarse, key=profile_score)
+    fine = np.arange(max(best - coarse_step, MIN_SKEW_ANGLE),
+                     min(best + coarse_step, MAX_SKEW_ANGLE) + fine_step / 2,
+                     fine_step)
+    best = max(fine, key=profile_score)
+    return round(float(best), 2)
+
+
+#---------------------QR-Code Detection---------------------#
+
+
+# QR code detector of this process, created once by get_qr_detector
+_qr_detector: Optional[cv2.QRCodeDetector] = None
+
+
+def get_qr_detector() -> cv2.QRCodeDetector:
+    """
+    Get the QR code detector of this process, created on first use.
+
+    Returns:
+        cv2.QRCodeDetector: The detector.
+    """
+    global _qr_detector
+    if _qr_detector is None:
+        _qr_detector = cv2.QRCodeDetector()
+    return _qr_detector
+
+
+def has_qr_candidate(image: np.ndarray,
+                     max_side: int = QR_PREFILTER_MAX_SIDE) -> bool:
+    """
+    Cheap check whether an image may contain a QR code.
+
+    The image is downscaled to max_side and binarized. QR codes have three
+    finder patterns, squares nested three levels deep; the image is a
+    candidate if the contour hierarchy contains at least QR_FINDER_PATTERNS
+    roughly square contours with two nested levels below them.
+
+    Args:
+        image (np.ndarray): Image loaded with OpenCV (BGR or grayscale).
+        max_side (int, optional): Longest side of the downscaled image.
+            Defaults to QR_PREFILTER_MAX_SIDE.
+
+    Returns:
+        bool: True if the image should be decoded.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    factor = max_side / max(image.shape[:2])
+    if factor < 1:
+        image = cv2.resize(image, None, fx=factor, fy=factor,
+                           interpolation=cv2.INTER_AREA)
+    binary = cv2.threshold(image, 0, 255,
+                           cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE,
+                                           cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return False
+    hierarchy = hierarchy[0]
+    finder_patterns = 0
+    for contour, (_, _, child, _) in zip(contours, hierarchy):
+        # hierarchy entries are (next, previous, first child, parent)
+        if child < 0 or hierarchy[child][2] < 0:
+            continue
+        _, _, width, height = cv2.boundingRect(contour)
+        if width >= 4 and height >= 4 and 0.5 < width / height < 2:
+            finder_patterns += 1
+            if finder_patterns >= QR_FINDER_PATTERNS:
+                return True
+    return False
+
+
+def decode_qr_code(image: np.ndarray, prefilter: bool = True) -> Optional[str]:
+    """
+    Read a QR code, running the full decoder only on candidate images.
+
+    Args:
+        image (np.ndarray): Image loaded with OpenCV.
+        prefilter (bool, optional): Skip images without QR code candidate
+            (see has_qr_candidate). Defaults to True.
+
+    Returns:
+        Optional[str]: Decoded QR-code text or None if there is no QR-code found.
+    """
+    if prefilter and not has_qr_candidate(image):
+        return None
+    value = get_qr_detector().detectAndDecode(image)[0]
+    return value if value else None
+
+
 #---------------------Image Preprocessing---------------------#
 
 
@@ -174,28 +326,46 @@ class ImageProcessor():
         Returns:
             Image: An instance of the Image class representing the thresholded image.
         """ 
+        image = self._apply_thresholding(self.image, thresh_mode)
+        image_instance = self.copy_this()
+        image_instance.image = image
+        return image_instance
+
+
+    def _apply_thresholding(self, image: np.ndarray, thresh_mode: Enum,
+                            dst: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Threshold a grayscale image, optionally into a preallocated buffer.
+
+        Args:
+            image (np.ndarray): Grayscale image.
+            thresh_mode (Threshmode): The thresholding mode to use (OTSU, ADAPTIVE_MEAN, or ADAPTIVE_GAUSSIAN).
+            dst (np.ndarray, optional): Output buffer of the same shape, may be
+                the input image itself. Defaults to None (new array).
+
+        Returns:
+            np.ndarray: The thresholded image.
+        """
         if thresh_mode == Threshmode.OTSU:
-            image = cv2.threshold(self.image, 0, 255,
-                                cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+            image = cv2.threshold(image, 0, 255,
+                                cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)[1]
         elif thresh_mode == Threshmode.ADAPTIVE_GAUSSIAN:
             #set blocksize and c_value
             gaussian_blocksize = self.blocksize if self.blocksize  else 73
             gaussian_c = self.c_value if self.c_value else 16
             
-            image = cv2.adaptiveThreshold(self.image ,255,
+            image = cv2.adaptiveThreshold(image ,255,
                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
-                gaussian_blocksize, gaussian_c)
+                gaussian_blocksize, gaussian_c, dst=dst)
         elif thresh_mode == Threshmode.ADAPTIVE_MEAN:
             #set blocksize and c_value
             mean_blocksize = self.blocksize if self.blocksize  else 35
             mean_c = self.c_value if self.c_value else 17
             
-            image = cv2.adaptiveThreshold(self.image ,255,
+            image = cv2.adaptiveThreshold(image ,255,
                 cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
-                mean_blocksize,mean_c)             
-        image_instance = self.copy_this()
-        image_instance.image = image
-        return image_instance
+                mean_blocksize,mean_c, dst=dst)
+        return image
 
 
     def dilate(self) -> ImageProcessor:
@@ -257,18 +427,38 @@ class ImageProcessor():
                               borderValue=background)
 
 
-    def get_skew_angle(self) -> Optional[np.float64]: #returns either float or None
+    def get_skew_angle(self, fast: bool = False) -> Optional[np.float64]: #returns either float or None
         """
         Calculate and return the skew angle of the image.
 
+        Args:
+            fast (bool, optional): Use estimate_skew on a downscaled image
+                instead of determine_skew. Defaults to False.
+
         Returns:
             Optional[np.float64]: The skew angle in degrees or None if it couldn't be determined.
         """ 
         grayscale = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
         #print(f"Calculating skew angle for {self.filename}")
-        angle = determine_skew(grayscale, max_angle = MAX_SKEW_ANGLE,
-                               min_angle=MIN_SKEW_ANGLE)
-        return angle
+        return self._skew_angle(grayscale, fast)
+
+
+    @staticmethod
+    def _skew_angle(grayscale: np.ndarray, fast: bool) -> Optional[np.float64]:
+        """
+        Calculate the skew angle of a grayscale image.
+
+        Args:
+            grayscale (np.ndarray): Grayscale image.
+            fast (bool): Use estimate_skew instead of determine_skew.
+
+        Returns:
+            Optional[np.float64]: The skew angle in degrees or None if it couldn't be determined.
+        """
+        if fast:
+            return estimate_skew(grayscale)
+        return determine_skew(grayscale, max_angle = MAX_SKEW_ANGLE,
+                              min_angle=MIN_SKEW_ANGLE)
 
 
     def deskew(self, angle: Optional[np.float64]) -> ImageProcessor:
@@ -293,49 +483,82 @@ class ImageProcessor():
         return image_instance
 
 
-    def preprocessing(self, thresh_mode: Threshmode) -> ImageProcessor:
+    def preprocessing(self, thresh_mode: Threshmode,
+                      fast_skew: bool = False) -> ImageProcessor:
         """
         Perform a series of preprocessing steps on the image.
 
         Args:
             thresh_mode (Threshmode): The thresholding mode to use (OTSU, ADAPTIVE_MEAN, or ADAPTIVE_GAUSSIAN).
+            fast_skew (bool, optional): Estimate the skew angle with
+                estimate_skew. Defaults to False.
 
         Returns:
             ImageProcessor: An instance of the Image class representing the preprocessed image.
         """
+        return next(self.preprocessing_variants([thresh_mode], fast_skew))[1]
+
+
+    def preprocessing_variants(self, thresh_modes: list[Threshmode],
+                               fast_skew: bool = False) -> Iterator[tuple[Threshmode, ImageProcessor]]:
+        """
+        Preprocess the image once for every thresholding mode, lazily.
+
+        Grayscale conversion, skew angle and blur are computed only once and
+        shared by all modes; a mode is only thresholded and deskewed when the
+        next variant is requested.
+
+        Args:
+            thresh_modes (list[Threshmode]): The thresholding modes in the order they are tried.
+            fast_skew (bool, optional): Estimate the skew angle with
+                estimate_skew. Defaults to False.
+
+        Yields:
+            tuple[Threshmode, ImageProcessor]: The mode and the preprocessed image.
+        """
+        # The steps of get_grayscale, blur, thresholding and deskew are fused:
+        # the grayscale image is computed once, used for the skew angle and
+        # then blurred and thresholded in place, only the rotation allocates
+        # a new (larger) array.
+        gray = (cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+                if self.image.ndim == 3 else self.image.copy())
         # Skew angle has to be calculated before processing
-        angle = self.get_skew_angle()
+        angle = self._skew_angle(gray, fast_skew)
 
         if angle is None:
             # Handle the case where angle is None, e.g., log a message or skip preprocessing
             print("Warning: Skew angle could not be determined. Skipping preprocessing.")
-            return self
+            yield thresh_modes[0], self
+            return
 
         # Perform preprocessing
-        image = self.get_grayscale()
-        image = image.blur()
-        image = image.thresholding(thresh_mode=thresh_mode)
-        image = image.deskew(angle)
-            # Check if angle is None before deskewing
-        if angle is not None:
-            image = image.deskew(angle)
-        return image
+        cv2.GaussianBlur(gray, (5,5), 0, dst=gray)
+        for i, thresh_mode in enumerate(thresh_modes):
+            # the last mode may overwrite the blurred image
+            dst = gray if i == len(thresh_modes) - 1 else None
+            image = self._apply_thresholding(gray, thresh_mode, dst=dst)
+            image_instance = self.copy_this()
+            image_instance.image = (self._rotate(image, angle, (255, 255, 255))
+                                    if angle else image)
+            yield thresh_mode, image_instance
 
 
 #---------------------Read QR-Code---------------------#
     
 
-    def read_qr_code(self) -> Optional[str]:
+    def read_qr_code(self, prefilter: bool = True) -> Optional[str]:
         """
         Tries to identify if a picture has a QR-code and then reads and returns it.
 
+        Args:
+            prefilter (bool, optional): Only decode images with a QR code
+                candidate (see has_qr_candidate). Defaults to True.
+
         Returns:
             Optional[str]: Decoded QR-code text as a str or None if there is no QR-code found.
         """
         try:
-            detect = cv2.QRCodeDetector()
-            value = detect.detectAndDecode(self.image)[0]
-            return value if value else None
+            return decode_qr_code(self.image, prefilter)
         except Exception as e:
             print(f"An error occurred while detecting and decoding QR code: {e}")
             return None
@@ -384,8 +607,62 @@ class Threshmode(Enum):
 #---------------------OCR Tesseract---------------------#
 
 
+# In-process engines of the 'api' backend, one per process and configuration
+_engines: dict = {}
+
+
+def _parse_config(config: str) -> dict[str, int]:
+    """
+    Read the page segmentation and engine mode from a Tesseract config string.
+
+    Args:
+        config (str): Configuration flags, e.g. CONFIG.
+
+    Returns:
+        dict[str, int]: The values of '--psm' and '--oem' found in the config.
+    """
+    flags = config.split()
+    return {flag[2:]: int(value) for flag, value in zip(flags, flags[1:])
+            if flag in ("--psm", "--oem")}
+
+
+def get_engine(languages: str = LANGUAGES, config: str = CONFIG):
+    """
+    Get the initialized libtesseract engine of this process.
+
+    The engine is created on first use and kept for the lifetime of the
+    process, so the language models are loaded only once per worker.
+
+    Args:
+        languages (str, optional): OCR languages. Defaults to LANGUAGES.
+        config (str, optional): Configuration flags, only '--psm' and '--oem'
+            are used. Defaults to CONFIG.
+
+    Returns:
+        tesserocr.PyTessBaseAPI: The initialized engine.
+    """
+    key = (languages, config)
+    if key not in _engines:
+        # imported here, so that the pytesseract backend does not need tesserocr
+        try:
+            import tesserocr
+        except ImportError as e:
+            raise ImportError(("The 'api' backend needs tesserocr, install it "
+                               "with 'pip install tesserocr'.")) from e
+        modes = _parse_config(config)
+        _engines[key] = tesserocr.PyTessBaseAPI(
+            lang=languages,
+            psm=modes.get("psm", tesserocr.PSM.AUTO),
+            oem=modes.get("oem", tesserocr.OEM.DEFAULT))
+    return _engines[key]
+
+
 class Tesseract:
-    def __init__(self, languages=LANGUAGES, config=CONFIG, image: Optional[ImageProcessor] = None):
+    def __init__(self, languages=LANGUAGES, config=CONFIG,
+                 image: Optional[ImageProcessor] = None,
+                 backend: str = "pytesseract",
+                 first_pass_languages: Optional[str] = None,
+                 min_confidence: float = MIN_CONFIDENCE):
         """
         Initialize the Tesseract OCR processor.
 
@@ -393,10 +670,24 @@ class Tesseract:
             languages (str, optional): OCR available languages. Defaults to LANGUAGES.
             config (str, optional): Additional custom configuration flags not available via the pytesseract function. Defaults to CONFIG.
             image (ImageProcessor, optional): An instance of the Image class representing the image to process. Defaults to None.
-        """
+            backend (str, optional): 'pytesseract' runs the tesseract executable for every image,
+                'api' keeps one libtesseract engine per process (needs tesserocr). Defaults to 'pytesseract'.
+            first_pass_languages (str, optional): If set, OCR runs with these languages first and only
+                falls back to all languages if the mean word confidence is below min_confidence.
+                Defaults to None (one pass with all languages).
+            min_confidence (float, optional): Mean word confidence (0-100) needed to accept the first pass.
+                Defaults to MIN_CONFIDENCE.
+        """
+        if backend not in TESSERACT_BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', choose one of {TESSERACT_BACKENDS}.")
         self.config = config
         self.languages = languages
         self.image = image 
+        self.backend = backend
+        self.first_pass_languages = first_pass_languages
+        self.min_confidence = min_confidence
+        #languages, seconds and confidence of every OCR pass of the last image
+        self.passes: list[tuple[str, float, Optional[float]]] = []
 
     @property
     def image(self) -> ImageProcessor:
@@ -420,19 +711,201 @@ class Tesseract:
         processed = result_raw.replace('\n', ' ')
         return processed
 
+    @staticmethod
+    def _data_to_string(data: dict[str, list]) -> tuple[str, Optional[float]]:
+        """
+        Rebuild the transcript and the mean word confidence from the output of
+        pytesseract.image_to_data.
+
+        Args:
+            data (dict[str, list]): Output of image_to_data as a dictionary.
+
+        Returns:
+            tuple[str, Optional[float]]: Transcript with one line per text line and the
+                mean word confidence (0-100), None if no word was found.
+        """
+        lines: dict[tuple, list[str]] = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            if float(data["conf"][i]) < 0 or not word.strip():
+                continue
+            line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(line, []).append(word)
+            confidences.append(float(data["conf"][i]))
+        transcript = "\n".join(" ".join(words) for words in lines.values())
+        confidence = sum(confidences) / len(confidences) if confidences else None
+        return transcript, confidence
+
+    def _recognize(self, languages: str,
+                   with_confidence: bool = False) -> tuple[str, Optional[float]]:
+        """
+        Apply OCR on the image with the given languages.
+
+        Args:
+            languages (str): OCR languages, e.g. 'eng+deu'.
+            with_confidence (bool, optional): Also compute the mean word confidence.
+                Defaults to False.
+
+        Returns:
+            tuple[str, Optional[float]]: Raw OCR output and the mean word confidence
+                (None if not computed or no word was found).
+        """
+        if self.backend == "api":
+            engine = get_engine(languages, self.config)
+            image = self.image.image
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            image = np.ascontiguousarray(image)
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            engine.SetImageBytes(image.tobytes(), width, height, channels,
+                                 width * channels)
+            transcript = engine.GetUTF8Text()
+            confidence = engine.MeanTextConf() if with_confidence else None
+            return transcript, confidence
+        if with_confidence:
+            # one tesseract run for words and confidences
+            data = py.image_to_data(self.image.image, languages, self.config,
+                                    output_type=py.Output.DICT)
+            return self._data_to_string(data)
+        return py.image_to_string(self.image.image, languages, self.config), None
+
+    def _timed_pass(self, languages: str,
+                    with_confidence: bool = False) -> tuple[str, Optional[float]]:
+        """
+        Run _recognize and record languages, duration and confidence in passes.
+
+        Args:
+            languages (str): OCR languages, e.g. 'eng+deu'.
+            with_confidence (bool, optional): Also compute the mean word confidence.
+                Defaults to False.
+
+        Returns:
+            tuple[str, Optional[float]]: Raw OCR output and the mean word confidence.
+        """
+        start = time.perf_counter()
+        transcript, confidence = self._recognize(languages, with_confidence)
+        self.passes.append((languages, time.perf_counter() - start, confidence))
+        return transcript, confidence
+
     def image_to_string(self) -> dict[str, str]:
         """
         Apply OCR and image parameters on JPG images.
 
+        In two-pass mode (first_pass_languages set) the image is read with the
+        first pass languages and only read again with all languages if the mean
+        word confidence is below min_confidence.
+
         Returns:
             dict[str, str]: A dictionary containing the image ID (filename) and the OCR-processed text.
         """
-        transcript = py.image_to_string(self.image.image, self.languages, self.config)
+        return self.image_to_string_with_confidence(with_confidence=False)[0]
+
+    def image_to_string_with_confidence(self, with_confidence: bool = True) -> tuple[dict[str, str], Optional[float]]:
+        """
+        Apply OCR like image_to_string and also return the mean word confidence.
+
+        Args:
+            with_confidence (bool, optional): Compute the confidence of the final pass. Defaults to True.
+
+        Returns:
+            tuple[dict[str, str], Optional[float]]: The transcript dictionary and the mean word
+                confidence (0-100) of the final pass, None if no word was found.
+        """
+        self.passes = []
+        confidence = None
+        if self.first_pass_languages and self.first_pass_languages != self.languages:
+            transcript, confidence = self._timed_pass(self.first_pass_languages,
+                                                      with_confidence=True)
+            if confidence is None or confidence < self.min_confidence:
+                transcript, confidence = self._timed_pass(self.languages, with_confidence)
+        else:
+            transcript, confidence = self._timed_pass(self.languages, with_confidence)
         transcript = self._process_string(transcript)
-        return {"ID": self.image.filename, "text": transcript}
+        return {"ID": self.image.filename, "text": transcript}, confidence
 
 
+def ocr_adaptive(image: ImageProcessor, tesseract: Tesseract,
+                 thresh_modes: Optional[list[Threshmode]] = None,
+                 min_confidence: float = MIN_CONFIDENCE,
+                 is_plausible: Optional[Callable[[str], bool]] = None,
+                 fast_skew: bool = False) -> tuple[dict[str, str], ImageProcessor]:
+    """
+    Apply OCR with the first thresholding mode and retry the following modes
+    only if the result is poor.
 
-        
-        
+    A result is poor if its mean word confidence is below min_confidence or
+    is_plausible rejects the text. If every mode gives a poor result, the one
+    with the highest confidence is kept.
+
+    Args:
+        image (ImageProcessor): The image to read.
+        tesseract (Tesseract): The Tesseract OCR processor.
+        thresh_modes (list[Threshmode], optional): Modes in the order they are tried.
+            Defaults to ADAPTIVE_MODES.
+        min_confidence (float, optional): Mean word confidence (0-100) of a good result.
+            Defaults to MIN_CONFIDENCE.
+        is_plausible (Callable[[str], bool], optional): Additional check of the text,
+            e.g. ocr_postprocessing.is_plausible_prediction. Defaults to None.
+        fast_skew (bool, optional): Estimate the skew angle with estimate_skew. Defaults to False.
+
+    Returns:
+        tuple[dict[str, str], ImageProcessor]: The transcript dictionary with the winning mode
+            under 'thresholding' and the preprocessed image of that mode.
+    """
+    if thresh_modes is None:
+        thresh_modes = [Threshmode[mode] for mode in ADAPTIVE_MODES]
+    best = None
+    passes = []
+    for thresh_mode, processed in image.preprocessing_variants(thresh_modes, fast_skew):
+        tesseract.image = processed
+        transcript, confidence = tesseract.image_to_string_with_confidence()
+        passes.extend(tesseract.passes)
+        score = confidence if confidence is not None else -1
+        if best is None or score > best[0]:
+            best = (score, thresh_mode, transcript, processed)
+        if (score >= min_confidence
+                and (is_plausible is None or is_plausible(transcript["text"]))):
+            best = (score, thresh_mode, transcript, processed)
+            break
+    _, thresh_mode, transcript, processed = best
+    tesseract.passes = passes
+    transcript["thresholding"] = thresh_mode.name
+    return transcript, processed
+
+
+def summarize_passes(passes: list[list[tuple[str, float, Optional[float]]]],
+                     languages: str = LANGUAGES) -> list[dict]:
+    """
+    Summarize the OCR passes of a run per language subset.
+
+    The saving of a subset is estimated against reading its images with all
+    languages at the mean duration measured for the full language set.
 
+    Args:
+        passes (list[list[tuple[str, float, Optional[float]]]]): Tesseract.passes of every image.
+        languages (str, optional): The full language set. Defaults to LANGUAGES.
+
+    Returns:
+        list[dict]: Per subset the number of images whose transcript came from it,
+            the number of passes, the mean seconds per pass and the estimated saved seconds.
+    """
+    summary: dict[str, dict] = {}
+    for image_passes in passes:
+        for subset, seconds, _ in image_passes:
+            entry = summary.setdefault(subset, {"languages": subset, "images": 0,
+                                                "passes": 0, "seconds": 0.0})
+            entry["passes"] += 1
+            entry["seconds"] += seconds
+        if image_passes:
+            summary[image_passes[-1][0]]["images"] += 1
+    full = summary.get(languages)
+    full_mean = full["seconds"] / full["passes"] if full else None
+    for entry in summary.values():
+        entry["mean_seconds"] = round(entry["seconds"] / entry["passes"], 3)
+        # images finished in this subset did not need a full pass
+        entry["saved_seconds"] = (round(entry["images"] * full_mean - entry["seconds"], 2)
+                                  if full_mean is not None and entry["languages"] != languages
+                                  else None)
+        entry["seconds"] = round(entry["seconds"], 2)
+    return list(summary.values())
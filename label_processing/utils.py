@@ -2,6 +2,7 @@
 import os
 import re
 import json
+import hashlib
 import pandas as pd
 import cv2
 from typing import Optional
@@ -164,6 +165,24 @@ def load_jpg(filepath: str) -> np.ndarray:
     return jpg
 
 
+def file_sha256(filepath: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Calculates the SHA-256 hash of a file's content.
+
+    Args:
+        filepath (str): path to the file
+        chunk_size (int, optional): number of bytes read at once
+
+    Returns:
+        str: hexadecimal SHA-256 digest
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
 def load_json(file: str):
     """
     Load JSON data from a file and deserialize it.
@@ -2,34 +2,235 @@
 from __future__ import annotations
 import io
 import os
+import json
+import hashlib
+import random
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Callable, Optional, TypeVar
+from google.api_core import exceptions
 from google.cloud import vision
+from google.oauth2 import service_account
 import warnings
 
 # Import the necessary module from the 'label_processing' module package
 import label_processing.utils
+from label_processing.result_cache import ResultCache
+from label_processing.journal import JsonlJournal
 
 # Suppress warning messages during execution
 warnings.filterwarnings('ignore')
 
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0 #first waiting time after a quota error, doubled per retry
+MAX_BATCH_SIZE = 16 #images per batch_annotate_images request allowed by the API
+MAX_BATCH_BYTES = 7_000_000 #image bytes per request, the JSON request is limited to 10 MB
+# errors after which the same request can be sent again
+RETRY_ERRORS = (exceptions.ResourceExhausted, exceptions.TooManyRequests,
+                exceptions.ServiceUnavailable, exceptions.DeadlineExceeded)
+
+T = TypeVar("T")
+
+
+#---------------------Client and Rate Limiting---------------------#
+
+
+def create_client(credentials: str) -> vision.ImageAnnotatorClient:
+    """
+    Create one authenticated Vision client, to be shared by all requests and threads.
+
+    Args:
+        credentials (str): Path to the service account credentials JSON file.
+
+    Returns:
+        vision.ImageAnnotatorClient: The client.
+    """
+    credentials = service_account.Credentials.from_service_account_file(credentials)
+    return vision.ImageAnnotatorClient(credentials=credentials)
+
+
+class RateLimiter():
+    """
+    Thread-safe limiter for the number of requests per second.
+
+    Attributes:
+        qps (float|None): Maximal requests per second, None for no limit.
+    """
+
+    def __init__(self, qps: Optional[float] = None) -> None:
+        """
+        Initialize the RateLimiter instance.
+
+        Args:
+            qps (float, optional): Maximal requests per second. Defaults to None (no limit).
+        """
+        if qps is not None and qps <= 0:
+            raise ValueError("qps has to be positive")
+        self.qps = qps
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self) -> None:
+        """
+        Block until the next request may be sent.
+        """
+        if self.qps is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1 / self.qps
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def call_with_retry(request: Callable[[], T], limiter: Optional[RateLimiter] = None,
+                    retries: int = MAX_RETRIES,
+                    backoff: float = BACKOFF_SECONDS) -> T:
+    """
+    Send a request, retrying with exponential backoff on quota and availability errors.
+
+    Args:
+        request (Callable[[], T]): Function sending the request.
+        limiter (RateLimiter, optional): Limiter consulted before every attempt. Defaults to None.
+        retries (int, optional): Maximal number of retries. Defaults to MAX_RETRIES.
+        backoff (float, optional): Waiting time before the first retry in seconds,
+            doubled for every further retry. Defaults to BACKOFF_SECONDS.
+
+    Raises:
+        google.api_core.exceptions.GoogleAPICallError: The last error if all retries failed.
+
+    Returns:
+        T: The response of the request.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            return request()
+        except RETRY_ERRORS:
+            if attempt == retries:
+                raise
+            # jitter keeps the threads from retrying at the same moment
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()) / 2)
+
+
+#---------------------Vision API---------------------#
+
+
+class VisionInput():
+    """
+    Image file prepared for the Google Vision API: read from disk once,
+    decoded at most once and re-encoded for the upload only if requested.
+
+    Attributes:
+        path (str): Path to the image file.
+        content (bytes): Original bytes of the file.
+        scale (float): Factor by which the uploaded image was downscaled,
+            1.0 if the original size is uploaded.
+    """
+
+    def __init__(self, path: str, content: bytes) -> None:
+        """
+        Initialize the VisionInput instance.
+
+        Args:
+            path (str): Path to the image file.
+            content (bytes): Bytes of the image file.
+        """
+        self.path = path
+        self.content = content
+        self.scale = 1.0
+        self._image: Optional[np.ndarray] = None
+
+    @staticmethod
+    def read(path: str) -> VisionInput:
+        """
+        Read the bytes of an image file.
+
+        Args:
+            path (str): Path to the image file.
+
+        Returns:
+            VisionInput: Instance holding the file content.
+        """
+        with io.open(path, 'rb') as image_file:
+            return VisionInput(path, image_file.read())
+
+    @property
+    def filename(self) -> str:
+        """str: Name of the image file, used as ID of the results."""
+        return os.path.basename(self.path)
+
+    @property
+    def image(self) -> Optional[np.ndarray]:
+        """Optional[np.ndarray]: Image decoded from content on first use, None if it is not readable."""
+        if self._image is None:
+            self._image = cv2.imdecode(np.frombuffer(self.content, np.uint8),
+                                       cv2.IMREAD_COLOR)
+        return self._image
+
+    def upload_bytes(self, jpeg_quality: Optional[int] = None,
+                     max_side: Optional[int] = None) -> bytes:
+        """
+        Get the bytes sent to the API.
+
+        Without options the original file content is sent unchanged. Otherwise
+        the decoded image is downscaled to max_side and encoded as JPG with
+        jpeg_quality; the original is kept if re-encoding would not make it
+        smaller.
+
+        Args:
+            jpeg_quality (int, optional): JPG quality (1-100) of the upload. Defaults to None.
+            max_side (int, optional): Longest side of the uploaded image in pixels. Defaults to None.
+
+        Returns:
+            bytes: Image bytes for the API request.
+        """
+        self.scale = 1.0
+        if (jpeg_quality is None and max_side is None) or self.image is None:
+            return self.content
+        image = self.image
+        scale = 1.0
+        if max_side is not None and max(image.shape[:2]) > max_side:
+            scale = max_side / max(image.shape[:2])
+            image = cv2.resize(image, None, fx=scale, fy=scale,
+                               interpolation=cv2.INTER_AREA)
+        params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if jpeg_quality else []
+        success, encoded = cv2.imencode(".jpg", image, params)
+        if not success or (scale == 1.0 and encoded.nbytes >= len(self.content)):
+            return self.content
+        self.scale = scale
+        return encoded.tobytes()
+
+
 class VisionApi():
     """
     Class for interacting with the Google Cloud Vision API for OCR tasks on images.
     """
 
-    def __init__(self, path: str, image: bytes, credentials: str, encoding: str) -> None:
+    def __init__(self, path: str, image: bytes, credentials: str, encoding: str,
+                 scale: float = 1.0) -> None:
         """
         Initialize the VisionApi instance.
 
         Args:
             path (str): Path to the image file.
             image (bytes): Image content in bytes.
-            credentials (str): Path to the credentials JSON file.
+            credentials (str|None): Path to the credentials JSON file, None if a client with
+                credentials is passed to vision_ocr.
             encoding (str): Encoding for the result ('ascii' or 'utf8').
+            scale (float, optional): Factor by which image was downscaled from the original file,
+                the bounding boxes are scaled back by it. Defaults to 1.0.
         """
-        VisionApi.export(credentials) #check credententials
+        if credentials is not None:
+            VisionApi.export(credentials) #check credententials
         self.image = image
         self.path = path
         self.encoding = encoding
+        self.scale = scale
 
     @staticmethod            
     def export(credentials: str) -> None:
@@ -57,6 +258,27 @@ class VisionApi():
         with io.open(path, 'rb') as image_file:
             image = image_file.read()
         return VisionApi(path, image, credentials, encoding)
+
+    @staticmethod
+    def from_input(vision_input: VisionInput, credentials: Optional[str] = None, encoding: str = 'utf8',
+                   jpeg_quality: Optional[int] = None,
+                   max_side: Optional[int] = None) -> VisionApi:
+        """
+        Create a VisionApi instance from an already read file without reading it again.
+
+        Args:
+            vision_input (VisionInput): The read image file.
+            credentials (str, optional): Path to the credentials JSON file. Defaults to None.
+            encoding (str, optional): Encoding for the result ('ascii' or 'utf8'). Defaults to 'utf8'.
+            jpeg_quality (int, optional): Re-encode the upload with this JPG quality. Defaults to None.
+            max_side (int, optional): Downscale the upload to this longest side. Defaults to None.
+
+        Returns:
+            VisionApi: Instance of the VisionApi class.
+        """
+        content = vision_input.upload_bytes(jpeg_quality, max_side)
+        return VisionApi(vision_input.path, content, credentials, encoding,
+                         scale=vision_input.scale)
     
     def process_string(self, result_raw: str) -> str:
         """
@@ -76,19 +298,88 @@ class VisionApi():
         else:
             return processed
         
-    def vision_ocr(self) -> dict[str, str]:
+    def cache_key(self) -> str:
+        """
+        Key of the response in a ResultCache: SHA-256 of the uploaded bytes,
+        upload scale and encoding.
+
+        Returns:
+            str: The cache key.
+        """
+        return f"vision:{hashlib.sha256(self.image).hexdigest()}:{self.scale}:{self.encoding}"
+
+    def from_cache(self, cache: Optional[ResultCache]) -> Optional[dict[str, str]]:
+        """
+        Look up the entry of this image in the cache.
+
+        Args:
+            cache (ResultCache, optional): The cache, None to skip the lookup.
+
+        Returns:
+            Optional[dict[str, str]]: The cached entry with the ID of this file or None.
+        """
+        if cache is None:
+            return None
+        value = cache.get(self.cache_key())
+        if value is None:
+            return None
+        entry = json.loads(value)
+        # identical images may have different filenames
+        entry["ID"] = os.path.basename(self.path)
+        return entry
+
+    def to_cache(self, cache: Optional[ResultCache], entry: dict[str, str]) -> None:
+        """
+        Store the entry of this image in the cache, entries with errors are not stored.
+
+        Args:
+            cache (ResultCache, optional): The cache, None to skip storing.
+            entry (dict[str, str]): Entry returned by response_to_entry.
+        """
+        if cache is not None and "error" not in entry:
+            cache.put(self.cache_key(), json.dumps(entry, ensure_ascii=False))
+
+    def vision_ocr(self, client: Optional[vision.ImageAnnotatorClient] = None,
+                   cache: Optional[ResultCache] = None) -> dict[str, str]:
         """
         Perform the actual API call, handle errors, and return the processed transcription.
 
+        Args:
+            client (vision.ImageAnnotatorClient, optional): Shared client, see create_client.
+                Defaults to None (a new client with the exported credentials).
+            cache (ResultCache, optional): Cache consulted before the API is called.
+                Defaults to None.
+
         Raises:
             Exception: Raises an exception if the API does not respond.
 
         Returns:
             Dict[str, str]: Dictionary with the filename and the transcript.
         """
-        client = vision.ImageAnnotatorClient()
+        entry = self.from_cache(cache)
+        if entry is not None:
+            return entry
+        if client is None:
+            client = vision.ImageAnnotatorClient()
         vision_image = vision.Image(content=self.image)
         response = client.text_detection(image=vision_image)
+        entry = self.response_to_entry(response)
+        self.to_cache(cache, entry)
+        return entry
+
+    def response_to_entry(self, response: vision.AnnotateImageResponse) -> dict[str, str]:
+        """
+        Turn the API response for this image into the processed transcription.
+
+        Args:
+            response (vision.AnnotateImageResponse): Response of text detection for this image.
+
+        Raises:
+            Exception: Raises an exception if the response contains an error.
+
+        Returns:
+            Dict[str, str]: Dictionary with the filename, the transcript and the bounding boxes.
+        """
         single_transcripts = response.text_annotations #get the ocr results
         #list of transcripts
         transcripts = [str(transcript.description) for transcript in single_transcripts]
@@ -96,7 +387,7 @@ class VisionApi():
         bounding_boxes = []
         for transcript in single_transcripts: 
             vertices = [
-            {word: f"({vertex.x},{vertex.y})"} for vertex, word in 
+            {word: f"({round(vertex.x / self.scale)},{round(vertex.y / self.scale)})"} for vertex, word in 
             zip(transcript.bounding_poly.vertices, transcripts)
             ]
             bounding_boxes.append(vertices)
@@ -116,5 +407,121 @@ class VisionApi():
         if label_processing.utils.check_text(entry["text"]): 
             entry = label_processing.utils.replace_nuri(entry)
         return entry
-        
-                
+
+
+#---------------------Batched Requests---------------------#
+
+
+def make_batches(vision_apis: list[VisionApi], batch_size: int = MAX_BATCH_SIZE,
+                 max_bytes: int = MAX_BATCH_BYTES) -> list[list[VisionApi]]:
+    """
+    Group images into batches of at most batch_size images and max_bytes image bytes.
+
+    Args:
+        vision_apis (list[VisionApi]): Images in the order of the results.
+        batch_size (int, optional): Maximal images per request. Defaults to MAX_BATCH_SIZE.
+        max_bytes (int, optional): Maximal image bytes per request. Defaults to MAX_BATCH_BYTES.
+
+    Returns:
+        list[list[VisionApi]]: Consecutive batches, an image larger than max_bytes forms its own batch.
+    """
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size has to be between 1 and {MAX_BATCH_SIZE}")
+    batches: list[list[VisionApi]] = []
+    batch_bytes = 0
+    for vision_api in vision_apis:
+        if (not batches or len(batches[-1]) == batch_size
+                or batch_bytes + len(vision_api.image) > max_bytes):
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(vision_api)
+        batch_bytes += len(vision_api.image)
+    return batches
+
+
+def batch_vision_ocr(vision_apis: list[VisionApi],
+                     client: Optional[vision.ImageAnnotatorClient] = None,
+                     limiter: Optional[RateLimiter] = None,
+                     batch_size: int = MAX_BATCH_SIZE,
+                     cache: Optional[ResultCache] = None) -> list[dict[str, str]]:
+    """
+    Apply text detection to several images with batch_annotate_images requests.
+
+    Images found in the cache are not sent. The others are grouped by
+    make_batches and every response is split back into the entries of
+    VisionApi.vision_ocr. Images whose response contains an error get an
+    entry with an empty text and the error message, so one bad image does not
+    fail its batch.
+
+    Args:
+        vision_apis (list[VisionApi]): Images to read.
+        client (vision.ImageAnnotatorClient, optional): Shared client, see create_client.
+            Defaults to None (a new client with the exported credentials).
+        limiter (RateLimiter, optional): Limits the requests per second. Defaults to None.
+        batch_size (int, optional): Maximal images per request. Defaults to MAX_BATCH_SIZE.
+        cache (ResultCache, optional): Cache of the entries by image content. Defaults to None.
+
+    Returns:
+        list[dict[str, str]]: Entries with 'ID', 'text' and 'bounding_boxes' (or 'error')
+            in the order of vision_apis.
+    """
+    entries: list[Optional[dict[str, str]]] = [vision_api.from_cache(cache)
+                                               for vision_api in vision_apis]
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if not missing:
+        return entries
+    if client is None:
+        client = vision.ImageAnnotatorClient()
+    feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+    for batch in make_batches([vision_apis[i] for i in missing], batch_size):
+        requests = [vision.AnnotateImageRequest(image=vision.Image(content=vision_api.image),
+                                                features=[feature])
+                    for vision_api in batch]
+        response = call_with_retry(
+            lambda: client.batch_annotate_images(requests=requests), limiter)
+        for vision_api, single_response in zip(batch, response.responses):
+            try:
+                entry = vision_api.response_to_entry(single_response)
+                vision_api.to_cache(cache, entry)
+            except Exception as e:
+                entry = {'ID': os.path.basename(vision_api.path), 'text': "",
+                         'error': str(e)}
+            entries[missing.pop(0)] = entry
+    return entries
+
+
+#---------------------Backup and Resume---------------------#
+
+
+class VisionBackup(JsonlJournal):
+    """
+    Backup of a Vision run with one line per transcribed image, so that an
+    interrupted run can be resumed. Texts may contain tabs and newlines,
+    JSON escapes them.
+
+    Attributes:
+        path (Path): Path to the backup file.
+        fsync_seconds (float): Maximal time between two syncs.
+    """
+
+    def load(self) -> dict[str, dict[str, str]]:
+        """
+        Read the entries of all finished images. Entries with an error and a
+        line that was cut off by an interruption are ignored, so these images
+        are sent again.
+
+        Returns:
+            dict[str, dict[str, str]]: Entries per ID (filename).
+        """
+        return {entry["ID"]: entry for entry in self.entries()
+                if "ID" in entry and "error" not in entry}
+
+    def write(self, entries: list[dict[str, str]]) -> None:
+        """
+        Append the entries of finished images.
+
+        Args:
+            entries (list[dict[str, str]]): Entries returned by batch_vision_ocr.
+        """
+        for entry in entries:
+            self.write_entry(entry)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+# Import third-party libraries
+import argparse
+import concurrent.futures
+import os
+import resource
+import time
+import warnings
+from pathlib import Path
+import pandas as pd
+
+# Suppress warning messages during execution
+warnings.filterwarnings('ignore')
+
+# Import the necessary modules from the 'label_processing' and 'label_evaluation' module packages
+from label_processing import label_detection_module
+from label_processing.detection_export import exported_model_path
+from label_evaluation import iou_scores
+
+
+#Setting filenames as Constants
+FILENAME_REPORT = "quantization_report.csv"
+MODEL_PATH = "../../models/label_detection_model.pth"
+THRESHOLD = 0.8
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments and return the parsed arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command-line arguments.
+    """
+    usage = ('detection_quantization_eval.py [-h] [-m <path to model>] '
+             '[-g <ground truth coordinates>] -j <path to jpgs> -r <results>')
+
+    # Define command-line arguments and their descriptions
+    parser = argparse.ArgumentParser(
+        description=("Compare latency, memory and IoU scores of the int8 "
+                     "quantized label detection model with the fp32 model."),
+        add_help = False,
+        usage = usage)
+
+    parser.add_argument(
+            '-h','--help',
+            action='help',
+            help='Open this help text.'
+            )
+
+    parser.add_argument(
+            '-m', '--model',
+            metavar='',
+            type=str,
+            default = MODEL_PATH,
+            help=('Path to the fp32 label detection model (.pth). The quantized\n'
+                  'model created by export_detection.py is expected next to it.')
+            )
+
+    parser.add_argument(
+            '-j', '--jpg_dir',
+            metavar='',
+            type=str,
+            required = True,
+            help=('Directory where the jpgs are stored.')
+            )
+
+    parser.add_argument(
+            '-g', '--ground_truth_coord',
+            metavar='',
+            type=str,
+            default = None,
+            help=('Path to the ground truth coordinates csv. If given, both\n'
+                  'models are also compared with the ground truth.')
+            )
+
+    parser.add_argument(
+            '-r', '--results',
+            metavar='',
+            type=str,
+            default = os.getcwd(),
+            help=('Target folder where the report is saved.\n'
+                  'Default is the user current working directory.')
+            )
+
+    return parser.parse_args()
+
+
+def iou_summary(df_pred: pd.DataFrame, df_reference: pd.DataFrame) -> tuple[float, float]:
+    """
+    Compare predicted boxes with reference boxes.
+
+    Args:
+        df_pred (pd.DataFrame): Predictions with a score of at least THRESHOLD.
+        df_reference (pd.DataFrame): Reference boxes (fp32 predictions or ground truth).
+
+    Returns:
+        tuple[float, float]: Mean IoU score and share of labels with an IoU
+            score of at least 0.8, both 0 without predictions.
+    """
+    if not len(df_pred):
+        return 0.0, 0.0
+    df_concat = iou_scores.concat_frames(df_pred.copy(), df_reference.copy())
+    return (round(df_concat["score"].mean(), 4),
+            round((df_concat["score"] >= 0.8).mean(), 4))
+
+
+def run_variant(path_to_model: str, backend: str,
+                jpg_dir: Path) -> tuple[dict, pd.DataFrame]:
+    """
+    Load one model variant and predict the labels of all JPG files.
+
+    Runs in its own process, so that the peak memory is measured per variant.
+
+    Args:
+        path_to_model (str): Path to the model file.
+        backend (str): Backend of PredictLabel.
+        jpg_dir (Path): Path to the directory with JPG files.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: Latency and memory of the variant and its
+            predictions with a score of at least THRESHOLD.
+    """
+    start = time.perf_counter()
+    predictor = label_detection_module.PredictLabel(path_to_model, ["label"],
+                                                    backend=backend)
+    load_seconds = time.perf_counter() - start
+    file_names = list(jpg_dir.glob("*.jpg"))
+    start = time.perf_counter()
+    df_pred = pd.concat([predictor.class_prediction(file_name)
+                         for file_name in file_names], ignore_index=True)
+    seconds = time.perf_counter() - start
+    df_pred = df_pred[df_pred.score >= THRESHOLD]
+    # ru_maxrss is given in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return ({"model": backend,
+             "model_size_mb": round(os.path.getsize(path_to_model) / 1e6, 1),
+             "load_seconds": round(load_seconds, 2),
+             "seconds_per_image": round(seconds / max(len(file_names), 1), 3),
+             "peak_rss_mb": round(peak_rss, 1),
+             "labels_predicted": len(df_pred)},
+            df_pred)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    jpg_dir = Path(args.jpg_dir)
+    variants = {"detecto": args.model,
+                "quantized": str(exported_model_path(args.model, "quantized"))}
+
+    report, predictions = [], {}
+    for backend, path_to_model in variants.items():
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            entry, df_pred = executor.submit(run_variant, path_to_model,
+                                             backend, jpg_dir).result()
+        report.append(entry)
+        predictions[backend] = df_pred
+
+    # IoU scores of the quantized boxes with the fp32 boxes as reference; the
+    # fp32 model is not compared with itself
+    entry_fp32, entry_int8 = report
+    entry_int8["mean_iou_fp32"], entry_int8["share_iou_fp32_above_0.8"] = \
+        iou_summary(predictions["quantized"], predictions["detecto"])
+
+    # both models compared with the ground truth, the fp32 row is the baseline
+    if args.ground_truth_coord:
+        df_gt = pd.read_csv(args.ground_truth_coord)
+        for entry in report:
+            entry["mean_iou_gt"], entry["share_iou_gt_above_0.8"] = \
+                iou_summary(predictions[entry["model"]], df_gt)
+
+    df_report = pd.DataFrame(report)
+    df_report["model"] = df_report["model"].replace({"detecto": "fp32",
+                                                     "quantized": "int8"})
+    print(df_report.to_string(index=False))
+    if args.ground_truth_coord:
+        print(f"Baseline fp32 vs. ground truth: mean IoU {entry_fp32['mean_iou_gt']}, "
+              f"share IoU >= 0.8 {entry_fp32['share_iou_gt_above_0.8']}")
+    report_path = os.path.join(args.results, FILENAME_REPORT)
+    df_report.to_csv(report_path, index=False)
+    print(f"The report has been successfully saved in {report_path}")
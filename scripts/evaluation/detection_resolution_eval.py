@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Import third-party libraries
+import argparse
+import os
+import time
+import warnings
+from pathlib import Path
+import pandas as pd
+
+# Suppress warning messages during execution
+warnings.filterwarnings('ignore')
+
+# Import the necessary modules from the 'label_processing' and 'label_evaluation' module packages
+from label_processing import label_detection_module
+from label_evaluation import iou_scores
+
+
+#Setting filenames as Constants
+FILENAME_REPORT = "resolution_report.csv"
+THRESHOLD = 0.8
+# without a max side the model resizes its input to a shortest side of 800
+# and a longest side of at most 1333, with a max side the network input has
+# exactly this longest side
+MAX_SIDES = [None, 1024, 800, 640]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments and return the parsed arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command-line arguments.
+    """
+    usage = ('detection_resolution_eval.py [-h] [-s N [N ...]] -j <path to jpgs> '
+             '-g <ground truth coordinates> -r <results>')
+
+    # Define command-line arguments and their descriptions
+    parser = argparse.ArgumentParser(
+        description=("Compare accuracy and speed of the label detection "
+                     "for different inference resolutions."),
+        add_help = False,
+        usage = usage)
+
+    parser.add_argument(
+            '-h','--help',
+            action='help',
+            help='Open this help text.'
+            )
+
+    parser.add_argument(
+            '-j', '--jpg_dir',
+            metavar='',
+            type=str,
+            required = True,
+            help=('Directory where the jpgs are stored.')
+            )
+
+    parser.add_argument(
+            '-g', '--ground_truth_coord',
+            metavar='',
+            type=str,
+            required = True,
+            help=('Path to the ground truth coordinates csv.')
+            )
+
+    parser.add_argument(
+            '-s', '--max_sides',
+            metavar='',
+            type=int,
+            nargs='+',
+            default = MAX_SIDES[1:],
+            help=('Longest image sides of the network input to evaluate, the '
+                  'default input size of the model (shortest side 800, longest '
+                  'side at most 1333) is always evaluated as reference. Default is '
+                  f'{" ".join(map(str, MAX_SIDES[1:]))}.')
+            )
+
+    parser.add_argument(
+            '-r', '--results',
+            metavar='',
+            type=str,
+            default = os.getcwd(),
+            help=('Target folder where the report is saved.\n'
+                  'Default is the user current working directory.')
+            )
+
+    return parser.parse_args()
+
+
+def evaluate_max_side(predictor: label_detection_module.PredictLabel,
+                      jpg_dir: Path, df_gt: pd.DataFrame,
+                      max_side: int | None, result_dir: str) -> dict:
+    """
+    Run the detection with one inference resolution and compare the boxes
+    with the ground truth.
+
+    Args:
+        predictor (PredictLabel): Prediction instance.
+        jpg_dir (Path): Path to the directory with JPG files.
+        df_gt (pd.DataFrame): Dataframe containing the ground truth.
+        max_side (int|None): Longest image side used for inference.
+        result_dir (str): Folder where the predictions csv is saved.
+
+    Returns:
+        dict: Speed and accuracy of this setting.
+    """
+    predictor.inference_max_side = max_side
+    file_names = list(jpg_dir.glob("*.jpg"))
+    start = time.perf_counter()
+    df_pred = pd.concat([predictor.class_prediction(file_name)
+                         for file_name in file_names], ignore_index=True)
+    seconds = time.perf_counter() - start
+
+    setting = "full" if max_side is None else str(max_side)
+    out_dir = Path(result_dir, f"max_side_{setting}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df_pred = label_detection_module.clean_predictions(jpg_dir, df_pred,
+                                                       THRESHOLD,
+                                                       out_dir=out_dir)
+    if len(df_pred):
+        df_concat = iou_scores.concat_frames(df_pred.copy(), df_gt.copy())
+        mean_iou = df_concat["score"].mean()
+        above_08 = (df_concat["score"] >= 0.8).mean()
+    else:
+        mean_iou, above_08 = 0.0, 0.0
+    return {"max_side": setting,
+            "seconds": round(seconds, 2),
+            "seconds_per_image": round(seconds / max(len(file_names), 1), 3),
+            "labels_predicted": len(df_pred),
+            "labels_ground_truth": len(df_gt[df_gt.filename.isin(
+                [file_name.name for file_name in file_names])]),
+            "mean_iou": round(mean_iou, 4),
+            "share_iou_above_0.8": round(above_08, 4)}
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    jpg_dir = Path(args.jpg_dir)
+    result_dir = args.results
+    df_gt = pd.read_csv(args.ground_truth_coord)
+
+    # Get model
+    model_path = "../../models/label_detection_model.pth"
+    predictor = label_detection_module.PredictLabel(model_path, ["label"])
+
+    report = [evaluate_max_side(predictor, jpg_dir, df_gt, max_side, result_dir)
+              for max_side in [None] + args.max_sides]
+    df_report = pd.DataFrame(report)
+    print(df_report.to_string(index=False))
+    report_path = os.path.join(result_dir, FILENAME_REPORT)
+    df_report.to_csv(report_path, index=False)
+    print(f"The report has been successfully saved in {report_path}")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# Import third-party libraries
+import argparse
+import glob
+import os
+import time
+import warnings
+import cv2
+import numpy as np
+import pandas as pd
+
+# Suppress warning messages during execution
+warnings.filterwarnings('ignore')
+
+# Import the necessary module from the 'label_processing' module package
+from label_processing.text_recognition import (ImageProcessor,
+                                               estimate_skew,
+                                               MIN_SKEW_ANGLE,
+                                               MAX_SKEW_ANGLE)
+from deskew import determine_skew
+
+
+#Setting filenames as Constants
+FILENAME_CSV = "skew_evaluation.csv"
+FILENAME_REPORT = "skew_report.csv"
+MAX_ROTATION = 8 #largest synthetic rotation in degrees
+SEED = 42
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments and return the parsed arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command-line arguments.
+    """
+    usage = 'skew_eval.py [-h] -d <crop-dir> -r <results>'
+
+    # Define command-line arguments and their descriptions
+    parser = argparse.ArgumentParser(
+        description=("Compare angle error and runtime of the fast skew "
+                     "estimation with deskew.determine_skew."),
+        add_help = False,
+        usage = usage)
+
+    parser.add_argument(
+            '-h','--help',
+            action='help',
+            help='Open this help text.'
+            )
+
+    parser.add_argument(
+            '-d', '--dir',
+            metavar='',
+            type=str,
+            required = True,
+            help=('Directory which contains the cropped jpgs.')
+            )
+
+    parser.add_argument(
+            '-r', '--results',
+            metavar='',
+            type=str,
+            default = os.getcwd(),
+            help=('Target folder where the results are saved.\n'
+                  'Default is the user current working directory.')
+            )
+
+    return parser.parse_args()
+
+
+def determine_skew_full(grayscale: np.ndarray) -> float:
+    """
+    Skew angle as calculated by ImageProcessor.get_skew_angle.
+
+    Args:
+        grayscale (np.ndarray): Grayscale image.
+
+    Returns:
+        float: The skew angle in degrees, 0 if it could not be determined.
+    """
+    angle = determine_skew(grayscale, max_angle=MAX_SKEW_ANGLE,
+                           min_angle=MIN_SKEW_ANGLE)
+    return angle if angle is not None else 0.0
+
+
+def estimate_skew_fast(grayscale: np.ndarray) -> float:
+    """
+    Skew angle as calculated by ImageProcessor.get_skew_angle(fast=True).
+
+    Args:
+        grayscale (np.ndarray): Grayscale image.
+
+    Returns:
+        float: The skew angle in degrees, 0 if it could not be determined.
+    """
+    angle = estimate_skew(grayscale)
+    return angle if angle is not None else 0.0
+
+
+def evaluate_file(file_path: str, rotation: float) -> dict:
+    """
+    Estimate the skew of a crop before and after a known rotation.
+
+    The crop itself may be skewed, so the error of a method is measured as the
+    difference between the change of its estimated angle and the applied
+    rotation.
+
+    Args:
+        file_path (str): Path to the crop.
+        rotation (float): Synthetic rotation in degrees.
+
+    Returns:
+        dict: Angles, errors and runtimes of both methods.
+    """
+    grayscale = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+    rotated = ImageProcessor._rotate(grayscale, rotation, 255)
+    entry = {"ID": os.path.basename(file_path), "rotation": round(rotation, 2)}
+    for name, method in (("determine_skew", determine_skew_full),
+                         ("fast", estimate_skew_fast)):
+        angle_original = method(grayscale)
+        start = time.perf_counter()
+        angle_rotated = method(rotated)
+        entry[f"{name}_seconds"] = time.perf_counter() - start
+        entry[f"{name}_angle"] = round(float(angle_original), 2)
+        # deskewing undoes the rotation, so the angle changes by -rotation
+        entry[f"{name}_error"] = abs(angle_rotated - angle_original + rotation)
+    return entry
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    rng = np.random.default_rng(SEED)
+    files = sorted(glob.glob(os.path.join(args.dir, "*.jpg")))
+    rotations = rng.uniform(-MAX_ROTATION, MAX_ROTATION, len(files))
+    df = pd.DataFrame([evaluate_file(file_path, rotation)
+                       for file_path, rotation in zip(files, rotations)])
+    df["angle_difference"] = (df["fast_angle"] - df["determine_skew_angle"]).abs()
+    df.to_csv(os.path.join(args.results, FILENAME_CSV), index=False)
+
+    report = pd.DataFrame([{
+        "method": name,
+        "mean_error": round(df[f"{name}_error"].mean(), 3),
+        "median_error": round(df[f"{name}_error"].median(), 3),
+        "share_error_below_1": round((df[f"{name}_error"] < 1).mean(), 3),
+        "ms_per_image": round(df[f"{name}_seconds"].mean() * 1000, 2)}
+        for name in ("determine_skew", "fast")])
+    print(report.to_string(index=False))
+    print(f"Mean difference of the angles on the original crops: "
+          f"{round(df['angle_difference'].mean(), 3)} degrees")
+    report_path = os.path.join(args.results, FILENAME_REPORT)
+    report.to_csv(report_path, index=False)
+    print(f"The report has been successfully saved in {report_path}")
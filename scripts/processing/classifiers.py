@@ -10,6 +10,13 @@ import time
 # Suppress warning messages during execution
 warnings.filterwarnings('ignore')
 
+# column prefixes of the models in the CSV of --all
+MODEL_NAMES = {
+    1: "nuri_not_nuri",
+    2: "hp",
+    3: "multi_single"
+}
+
 
 def parse_arguments() -> argparse.Namespace:
     """
@@ -18,7 +25,7 @@ def parse_arguments() -> argparse.Namespace:
     Returns:
         argparse.Namespace: Parsed command-line arguments.
     """
-    usage = 'classifiers.py [-h] -m <model number> -j <path to jpgs> -o <path to outputs>'
+    usage = 'classifiers.py [-h] [-b N] [--sort_mode <mode>] (-m <model number> | -a) -j <path to jpgs> -o <path to outputs>'
     
     # Define command-line arguments and their descriptions
     parser = argparse.ArgumentParser(
@@ -32,7 +39,9 @@ def parse_arguments() -> argparse.Namespace:
             help='Description of the command-line arguments.'
             )
 
-    parser.add_argument(
+    model_group = parser.add_mutually_exclusive_group(required=True)
+
+    model_group.add_argument(
         '-m', '--model',
         type=int,
         choices=range(1, 4),
@@ -42,6 +51,13 @@ def parse_arguments() -> argparse.Namespace:
              '3: multi label image or single label image')
     )
 
+    model_group.add_argument(
+        '-a', '--all',
+        action='store_true',
+        help=('Load all three classifier models and pass every batch of images\n'
+              'to each of them. Writes one CSV with a class and score column per model.')
+    )
+
     parser.add_argument(
         '-o', '--out_dir',
         type=str,
@@ -56,6 +72,25 @@ def parse_arguments() -> argparse.Namespace:
         help=('Directory where the inputs (JPEG images) are stored.')
     )
 
+    parser.add_argument(
+        '-b', '--batch_size',
+        type=int,
+        default=label_processing.tensorflow_classifier.BATCH_SIZE,
+        help=('Number of images per model call; decoding and resizing run in parallel\n'
+              f'(default: {label_processing.tensorflow_classifier.BATCH_SIZE}).')
+    )
+
+    parser.add_argument(
+        '--sort_mode',
+        type=str,
+        choices=label_processing.tensorflow_classifier.SORT_MODES,
+        default="reflink",
+        help=('How the images are placed in the class directories: reflink (copy-on-write\n'
+              'clone), hardlink or copy keep the original bytes, reflink and hardlink fall\n'
+              'back to copy where unsupported; reencode decodes and writes them again\n'
+              '(default: reflink).')
+    )
+
     return parser.parse_args()
 
 def get_model_path(model_int):
@@ -95,6 +130,33 @@ def get_class_names(model_int):
     return class_names.get(model_int)
 
 
+def run_all_models(jpeg_dir: str, out_dir: str, batch_size: int, sort_mode: str = "reflink") -> None:
+    """
+    Classify the images with all three models in one pass and sort them into
+    the class directories of every model.
+
+    Args:
+        jpeg_dir (str): Directory where the JPEG images are stored.
+        out_dir (str): Directory to store the classified pictures and the CSV.
+        batch_size (int): Number of images per model call.
+        sort_mode (str, optional): How the images are placed in the class directories.
+            Defaults to 'reflink'.
+    """
+    models = {name: label_processing.tensorflow_classifier.get_model(get_model_path(model_int))
+              for model_int, name in MODEL_NAMES.items()}
+    class_names = {name: get_class_names(model_int) for model_int, name in MODEL_NAMES.items()}
+
+    # Model Predictions and save one CSV for all models
+    df = label_processing.tensorflow_classifier.multi_class_prediction(
+        models, class_names, jpeg_dir, out_dir=out_dir, batch_size=batch_size)
+
+    # Save classified pictures, the class names of the models differ
+    for name in models:
+        df_model = df[["filename", f"{name}_class"]].rename(columns={f"{name}_class": "class"})
+        label_processing.tensorflow_classifier.filter_pictures(jpeg_dir, df_model, out_dir=out_dir,
+                                                              mode=sort_mode)
+
+
 def main():
     """
     Main function to execute the script.
@@ -102,19 +164,25 @@ def main():
     start_time = time.time()
     args = parse_arguments()
     
-    model_path = get_model_path(args.model)
-    class_names = get_class_names(args.model)
     jpeg_dir = args.jpg_dir
     out_dir = args.out_dir
 
-    # Call the Model
-    model = label_processing.tensorflow_classifier.get_model(model_path)
+    if args.all:
+        run_all_models(jpeg_dir, out_dir, args.batch_size, args.sort_mode)
+    else:
+        model_path = get_model_path(args.model)
+        class_names = get_class_names(args.model)
+
+        # Call the Model
+        model = label_processing.tensorflow_classifier.get_model(model_path)
 
-    # Model Predictions and save CSV
-    df = label_processing.tensorflow_classifier.class_prediction(model, class_names, jpeg_dir, out_dir=out_dir)
+        # Model Predictions and save CSV
+        df = label_processing.tensorflow_classifier.class_prediction(model, class_names, jpeg_dir, out_dir=out_dir,
+                                                                   batch_size=args.batch_size)
 
-    # Save classified pictures
-    label_processing.tensorflow_classifier.filter_pictures(jpeg_dir, df, out_dir=out_dir)
+        # Save classified pictures
+        label_processing.tensorflow_classifier.filter_pictures(jpeg_dir, df, out_dir=out_dir,
+                                                              mode=args.sort_mode)
 
     end_time = time.time()
     duration = end_time - start_time
@@ -13,9 +13,16 @@ warnings.filterwarnings('ignore')
 # Import the necessary module from the 'label_processing' module package
 import label_processing.label_detection_module as scrop
 from label_processing.label_detection_module import create_crops
+from label_processing.detection_export import BACKENDS, exported_model_path
+from label_processing.result_cache import ResultCache
 
 THRESHOLD = 0.8
 PROCESSES = 1
+BATCH_SIZE = 1
+CACHE_FILENAME = "detection_cache.sqlite"
+CACHE_SIZE_MB = 1024
+JOURNAL_SUFFIX = "_journal.jsonl"
+STREAM_JOURNAL_SUFFIX = "_stream_journal.jsonl" #filtered predictions of --stream
 
 def parse_arguments() -> argparse.Namespace:
     """
@@ -24,7 +31,7 @@ def parse_arguments() -> argparse.Namespace:
     Returns:
         argparse.Namespace: Parsed command-line arguments.
     """
-    usage = 'detection.py [-h] [-c N] [-np N] -j <path to jpgs> -o <path to jpgs outputs>'
+    usage = 'detection.py [-h] [-c N] [-np N] [-b N] [-s N] [-t N] [--tile_overlap N] [--stream] [--crop_threads N] [--backend <backend>] [--no-cache] [--cache_file <path>] [--resume] -j <path to jpgs> -o <path to jpgs outputs>'
 
     # Define command-line arguments and their descriptions
     parser = argparse.ArgumentParser(
@@ -55,7 +62,116 @@ def parse_arguments() -> argparse.Namespace:
             help=('Directory where the jpgs are stored.')
             )
 
-    return parser.parse_args()
+    parser.add_argument(
+            '-b', '--batch_size',
+            metavar='',
+            type=int,
+            default = BATCH_SIZE,
+            help=('Number of images passed to the model at once.\n'
+                  'Batches of 4-8 speed up CPU inference. Default is 1.')
+            )
+
+    parser.add_argument(
+            '-s', '--max_side',
+            metavar='',
+            type=int,
+            default = None,
+            help=('Longest image side in pixels of the network input.\n'
+                  'Smaller values make the detection faster, the crops are\n'
+                  'still cut from the full resolution images. Not supported\n'
+                  'by the onnx backend. Default is the input size of the\n'
+                  'model (shortest side 800, longest side at most 1333).')
+            )
+
+    parser.add_argument(
+            '-t', '--tile_size',
+            metavar='',
+            type=int,
+            default = None,
+            help=('Detect labels in overlapping square tiles of this size, so\n'
+                  'that the memory of the inference does not grow with the\n'
+                  'size of very large scans. Default is the whole image at once.')
+            )
+
+    parser.add_argument(
+            '--tile_overlap',
+            metavar='',
+            type=int,
+            default = scrop.TILE_OVERLAP,
+            help=('Overlap of neighbouring tiles in pixels, should be larger\n'
+                  f'than the largest label. Default is {scrop.TILE_OVERLAP}.')
+            )
+
+    parser.add_argument(
+            '--stream',
+            action=argparse.BooleanOptionalAction,
+            default=False,
+            help=('Detect and crop every image in one step, so each image is\n'
+                  'decoded only once and the crops and csv rows are written\n'
+                  'while the detection is still running. Images are predicted\n'
+                  'one by one, so --batch_size cannot be used.')
+            )
+
+    parser.add_argument(
+            '--crop_threads',
+            metavar='',
+            type=int,
+            default = scrop.CROP_THREADS,
+            help=('Number of threads that load the images and save the crops.\n'
+                  'Every thread holds one full resolution image in memory.\n'
+                  f'Not used with --stream. Default is {scrop.CROP_THREADS}.')
+            )
+
+    parser.add_argument(
+            '--backend',
+            metavar='',
+            choices = BACKENDS,
+            default = "detecto",
+            help=('Runtime of the detection model: detecto, torchscript, onnx\n'
+                  'or quantized (int8 for CPU). All but detecto need the models\n'
+                  'created by export_detection.py. Default is detecto.')
+            )
+
+    parser.add_argument(
+            '--cache',
+            action=argparse.BooleanOptionalAction,
+            default=True,
+            help=('Reuse the predictions of images that did not change since an\n'
+                  'earlier run with the same model. Use --no-cache to disable.')
+            )
+
+    parser.add_argument(
+            '--cache_file',
+            metavar='',
+            type=str,
+            default = None,
+            help=('SQLite file of the prediction cache.\n'
+                  f'Default is {CACHE_FILENAME} in the output directory.')
+            )
+
+    parser.add_argument(
+            '--cache_size',
+            metavar='',
+            type=float,
+            default = CACHE_SIZE_MB,
+            help=('Maximal size of the prediction cache in megabytes, the least\n'
+                  f'recently used entries are removed. Default is {CACHE_SIZE_MB}.')
+            )
+
+    parser.add_argument(
+            '--resume',
+            action=argparse.BooleanOptionalAction,
+            default=False,
+            help=('Continue an interrupted run: images already listed in the\n'
+                  f'progress journal (<jpg dir>{JOURNAL_SUFFIX} in the output\n'
+                  f'directory, <jpg dir>{STREAM_JOURNAL_SUFFIX} with --stream)\n'
+                  'are not predicted again.')
+            )
+
+    args = parser.parse_args()
+    if args.stream and args.batch_size != BATCH_SIZE:
+        parser.error("--batch_size cannot be used with --stream")
+    return args
 
 
 # does not execute main if the script is imported as a module
@@ -69,21 +185,50 @@ if __name__ == '__main__':
     #model_path = os.path.join(script_dir, rel_path)
     #model_path = "/home/leonardopreuss/Projects/mfnb_label_pipeline/python-label_processing_private/old/models/model_labels_box.pth"
 
+    if args.backend != "detecto":
+        model_path = exported_model_path(model_path, args.backend)
+
     jpg_dir = Path(args.jpg_dir)
     classes = ["label"]
     out_dir = args.out_dir
     
-    predictor = scrop.PredictLabel(model_path, classes)
-    
-    # 1. Model Predictions
-    df = scrop.prediction_parallel(jpg_dir,predictor, 12)
-    finish = time.perf_counter()
+    cache = None
+    if args.cache:
+        cache_file = args.cache_file if args.cache_file \
+            else os.path.join(out_dir, CACHE_FILENAME)
+        cache = ResultCache(cache_file, max_size_mb=args.cache_size)
 
-    # 2. Filter model predictions and save csv
-    df = scrop.clean_predictions(jpg_dir, df, THRESHOLD, out_dir = out_dir)
-    print(f"Finished in {round(finish-start, 2)} second(s)")
+    predictor = scrop.PredictLabel(model_path, classes, threshold=THRESHOLD,
+                                   inference_max_side=args.max_side,
+                                   backend=args.backend, cache=cache,
+                                   tile_size=args.tile_size,
+                                   tile_overlap=args.tile_overlap)
+
+    try:
+        if args.stream:
+            journal_path = os.path.join(out_dir, f"{jpg_dir.stem}{STREAM_JOURNAL_SUFFIX}")
+            # Model predictions, filtering, csv and cropping in one pass
+            df = scrop.prediction_streaming(jpg_dir, predictor, 12, out_dir=out_dir,
+                                            journal_path=journal_path,
+                                            resume=args.resume)
+        else:
+            # 1. Model Predictions
+            journal_path = os.path.join(out_dir, f"{jpg_dir.stem}{JOURNAL_SUFFIX}")
+            df = scrop.prediction_parallel(jpg_dir, predictor, 12,
+                                           batch_size=args.batch_size,
+                                           journal_path=journal_path,
+                                           resume=args.resume)
+            finish = time.perf_counter()
+
+            # 2. Filter model predictions and save csv
+            df = scrop.clean_predictions(jpg_dir, df, THRESHOLD, out_dir = out_dir)
+            print(f"Finished in {round(finish-start, 2)} second(s)")
 
-    # 3. Cropping
-    create_crops(jpg_dir, df, out_dir = out_dir)
+            # 3. Cropping
+            create_crops(jpg_dir, df, out_dir = out_dir,
+                         n_threads=args.crop_threads)
+    finally:
+        if cache is not None:
+            cache.close()
     finish = time.perf_counter()
     print(f"Finished in {round(finish-start, 2)} second(s)")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Import third-party libraries
+import argparse
+import os
+import time
+import warnings
+
+# Suppress warning messages during execution
+warnings.filterwarnings('ignore')
+
+# Import the necessary module from the 'label_processing' module package
+from label_processing.label_detection_module import PredictLabel
+from label_processing.detection_export import (exported_model_path,
+                                               export_torchscript,
+                                               export_onnx,
+                                               export_quantized)
+
+MODEL_PATH = "../../models/label_detection_model.pth"
+FORMATS = ("torchscript", "onnx", "quantized")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command-line arguments using argparse.
+
+    Returns:
+        argparse.Namespace: Parsed command-line arguments.
+    """
+    usage = 'export_detection.py [-h] [-m <path to model>] [-f <formats>] [-o <output dir>]'
+
+    # Define command-line arguments and their descriptions
+    parser = argparse.ArgumentParser(
+        description=("Export the label detection model to TorchScript, ONNX and "
+                     "an int8 quantized TorchScript model for the corresponding "
+                     "backends of detection.py."),
+        add_help = False,
+        usage = usage)
+
+    parser.add_argument(
+            '-h','--help',
+            action='help',
+            help='Description of the command-line arguments.'
+            )
+
+    parser.add_argument(
+            '-m', '--model',
+            metavar='',
+            type=str,
+            default = MODEL_PATH,
+            help=('Path to the Detecto label detection model (.pth).\n'
+                  f'Default is {MODEL_PATH}.')
+            )
+
+    parser.add_argument(
+            '-f', '--formats',
+            metavar='',
+            nargs='+',
+            choices = FORMATS,
+            default = list(FORMATS),
+            help=('Formats to export: torchscript, onnx and/or quantized.\n'
+                  'Default is all of them.')
+            )
+
+    parser.add_argument(
+            '-o', '--out_dir',
+            metavar='',
+            type=str,
+            default = None,
+            help=('Directory in which the exported models will be stored.\n'
+                  'Default is the directory of the model.')
+            )
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    args = parse_arguments()
+
+    predictor = PredictLabel(args.model, ["label"])
+    out_dir = args.out_dir if args.out_dir else os.path.dirname(args.model)
+    for export_format in args.formats:
+        out_path = os.path.join(out_dir, exported_model_path(args.model, export_format).name)
+        if export_format == "torchscript":
+            export_torchscript(predictor.model, out_path)
+        elif export_format == "onnx":
+            export_onnx(predictor.model, out_path)
+        else:
+            export_quantized(predictor.model, out_path)
+        print(f"\nThe {export_format} model has been successfully saved in {out_path}")
+
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
@@ -17,8 +17,14 @@ from label_processing.text_recognition import (Tesseract,
                                                ImageProcessor,
                                                Threshmode,
                                                find_tesseract,
+                                               TESSERACT_BACKENDS,
+                                               FIRST_PASS_LANGUAGES,
+                                               MIN_CONFIDENCE,
+                                               summarize_passes,
+                                               ocr_adaptive,
                                                )
 from label_processing import utils
+from label_postprocessing.ocr_postprocessing import is_plausible_prediction
 
 # Suppress warning messages during execution
 warnings.filterwarnings('ignore')
@@ -33,8 +39,8 @@ def parse_arguments() -> argparse.Namespace:
     Returns:
         argparse.Namespace: Parsed command-line arguments.
     """
-    usage = 'tesseract.py [-h] [-v] [-t <thresholding>] [-b <blocksize>] \
-            [-c <c_value>] -d <crop-dir> [-multi <multiprocessing>] -o <outdir> [-o <out-dir>]'
+    usage = 'tesseract.py [-h] [-v] [-t <thresholding>] [--adaptive] [-b <blocksize>] \
+            [-c <c_value>] [--fast_skew] [--backend <backend>] [--two_pass] [--first_pass_languages <languages>] [--min_confidence N] -d <crop-dir> [-multi <multiprocessing>] -o <outdir> [-o <out-dir>]'
     
     # Define command-line arguments and their descriptions
     parser = argparse.ArgumentParser(
@@ -71,6 +77,16 @@ def parse_arguments() -> argparse.Namespace:
                  '3 : Gaussian adaptive thresholding.\n'
                  'Default is otsus.')
             )
+
+    parser.add_argument(
+            '--adaptive',
+            action=argparse.BooleanOptionalAction,
+            default=False,
+            help=('Optional argument: apply Otsu\'s thresholding first and retry\n'
+                  'adaptive mean and Gaussian adaptive thresholding only for crops\n'
+                  'with a low word confidence or an implausible transcript.\n'
+                  'The winning mode is saved with every transcript. Overrides -t.')
+            )
     
     parser.add_argument(
             '-b', '--blocksize',
@@ -90,6 +106,54 @@ def parse_arguments() -> argparse.Namespace:
             help=('Optional argument: c_value parameter for adaptive thresholding.')
             )
     
+    parser.add_argument(
+            '--fast_skew',
+            action=argparse.BooleanOptionalAction,
+            default=False,
+            help=('Optional argument: estimate the skew angle on a downscaled\n'
+                  'binary image instead of the full resolution crop (faster).')
+            )
+
+    parser.add_argument(
+            '--backend',
+            metavar='',
+            choices = TESSERACT_BACKENDS,
+            default = "pytesseract",
+            help=('Optional argument: how Tesseract is run.\n'
+                  'pytesseract : the tesseract executable is started for every image.\n'
+                  'api : one libtesseract engine per process is kept in memory,\n'
+                  'the language models are loaded only once (needs tesserocr).\n'
+                  'Default is pytesseract.')
+            )
+
+    parser.add_argument(
+            '--two_pass',
+            action=argparse.BooleanOptionalAction,
+            default=False,
+            help=('Optional argument: read every crop with the first pass languages\n'
+                  'and only read it again with all languages if the mean word\n'
+                  'confidence is too low. The time per language set is reported.')
+            )
+
+    parser.add_argument(
+            '--first_pass_languages',
+            metavar='',
+            type=str,
+            default = FIRST_PASS_LANGUAGES,
+            help=('Optional argument: languages of the first pass, e.g. eng+deu.\n'
+                  f'Default is {FIRST_PASS_LANGUAGES}.')
+            )
+
+    parser.add_argument(
+            '--min_confidence',
+            metavar='',
+            type=float,
+            default = MIN_CONFIDENCE,
+            help=('Optional argument: mean word confidence (0-100) needed to keep\n'
+                  'the first pass (--two_pass) or the first thresholding mode\n'
+                  f'(--adaptive) result. Default is {MIN_CONFIDENCE}.')
+            )
+
     parser.add_argument(
             '-o', '--outdir',
             metavar='',
@@ -122,7 +186,7 @@ def ocr_on_file(file_path: str,
                 args: argparse.Namespace,
                 thresh_mode: Threshmode,
                 tesseract: Tesseract,
-                new_dir: str) -> tuple[dict, bool, bool]:
+                new_dir: str) -> tuple[dict, bool, bool, list]:
     """
     Perform OCR on an image file, including preprocessing and reading QR codes if present.
 
@@ -134,11 +198,12 @@ def ocr_on_file(file_path: str,
         new_dir (str): The directory where the preprocessed image will be saved.
 
     Returns:
-        Tuple[dict, bool, bool]: A tuple containing the transcript dictionary, a boolean indicating QR code detection, and a boolean indicating Nuri detection.
+        Tuple[dict, bool, bool, list]: A tuple containing the transcript dictionary, a boolean indicating QR code detection, a boolean indicating Nuri detection and the OCR passes (languages, seconds, confidence).
     """
     image = ImageProcessor.read_image(file_path)
     qr = False
     nuri = False
+    passes = []
     if args.blocksize is not None:
         image.blocksize(args.blocksize)
     if args.c_value is not None:
@@ -153,17 +218,26 @@ def ocr_on_file(file_path: str,
     else:
         # Preprocessing
         # verbose_print(f"Performing preprocessing on {image.filename}")
-        image = image.preprocessing(thresh_mode)  # preprocessed image
-        image.save_image(new_dir)  # saving image in new directory
-        # OCR
-        tesseract.image = image
-        # verbose_print(f"Performing OCR on {image.filename}\n")
-        transcript: dict[str, str] = tesseract.image_to_string()
+        if args.adaptive:
+            # OCR with retries of the thresholding modes
+            transcript, image = ocr_adaptive(image, tesseract,
+                                             min_confidence=args.min_confidence,
+                                             is_plausible=is_plausible_prediction,
+                                             fast_skew=args.fast_skew)
+            image.save_image(new_dir)  # saving image of the winning mode
+        else:
+            image = image.preprocessing(thresh_mode, fast_skew=args.fast_skew)  # preprocessed image
+            image.save_image(new_dir)  # saving image in new directory
+            # OCR
+            tesseract.image = image
+            # verbose_print(f"Performing OCR on {image.filename}\n")
+            transcript: dict[str, str] = tesseract.image_to_string()
+        passes = tesseract.passes
         # get nuri
         if utils.check_text(transcript["text"]):
             nuri = True
             transcript = utils.replace_nuri(transcript)
-    return (transcript, qr, nuri)
+    return (transcript, qr, nuri, passes)
 
 
 def ocr_on_dir(crop_dir: str,
@@ -182,8 +256,12 @@ def ocr_on_dir(crop_dir: str,
     Returns:
         List[dict[str, str]]: A list containing dictionaries with OCR results for each image.
     """
-    tesseract = Tesseract()
+    first_pass_languages = args.first_pass_languages if args.two_pass else None
+    tesseract = Tesseract(backend=args.backend,
+                          first_pass_languages=first_pass_languages,
+                          min_confidence=args.min_confidence)
     ocr_results: list = []
+    ocr_passes: list = []
     count_qr: int = 0
     total_nuri: int = 0
     thresh_mode: Enum = Threshmode.eval(args.thresholding)
@@ -191,21 +269,35 @@ def ocr_on_dir(crop_dir: str,
     files = glob.glob(os.path.join(f"{crop_dir}/*.jpg"))
     if not args.multiprocessing:
         for file in files:
-            transcript, qr, nuri = ocr_on_file(file, args,  thresh_mode, tesseract, new_dir)
+            transcript, qr, nuri, passes = ocr_on_file(file, args,  thresh_mode, tesseract, new_dir)
             ocr_results.append(transcript)
+            ocr_passes.append(passes)
             if qr == True: count_qr += 1
             if nuri == True: total_nuri += 1
     else:
     # Use all the cores
         with mp.Pool() as pool:
             result = pool.starmap(ocr_on_file, [(file, args,  thresh_mode, tesseract, new_dir) for file in files])
-            for transcript, qr, nuri in result:
+            for transcript, qr, nuri, passes in result:
                 ocr_results.append(transcript)
+                ocr_passes.append(passes)
                 if qr == True: count_qr += 1
                 if nuri == True: total_nuri += 1
 
     verbose_print(f"QR-codes read: {count_qr}")
     verbose_print(f"get_nuri: {total_nuri}")
+    if args.adaptive:
+        modes = [result["thresholding"] for result in ocr_results if "thresholding" in result]
+        print("\nThresholding modes used:")
+        for mode in dict.fromkeys(modes):
+            print(f"{mode}: {modes.count(mode)} image(s)")
+    if args.two_pass:
+        print("\nOCR time per language set:")
+        for entry in summarize_passes(ocr_passes, tesseract.languages):
+            print((f"{entry['languages']}: {entry['images']} image(s), "
+                   f"{entry['passes']} pass(es), {entry['mean_seconds']} s per pass"
+                   + (f", {entry['saved_seconds']} s saved compared to all languages"
+                      if entry['saved_seconds'] is not None else "")))
     return ocr_results
 
 if __name__ == "__main__":
@@ -214,8 +306,9 @@ if __name__ == "__main__":
     #New function verbose print
     verbose_print: Callable = print if args.verbose else lambda *a, **k: None    
     #Find path to tesseract
-    find_tesseract()
-    verbose_print("Tesseract succesfully detected.\n")
+    if args.backend == "pytesseract":
+        find_tesseract()
+        verbose_print("Tesseract succesfully detected.\n")
     crop_dir = args.dir
     utils.check_dir(crop_dir)
     new_dir = utils.generate_filename(crop_dir, "preprocessed")
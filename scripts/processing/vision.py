@@ -8,19 +8,28 @@ import glob
 import os
 import warnings
 import time
+import concurrent.futures
 import cv2  # Import OpenCV for QR code detection
+from typing import Iterator, Optional
 from google.cloud import vision
-from google.oauth2 import service_account
 
 # Import the necessary module from the 'label_processing' module package
-from label_processing import vision, utils
+from label_processing import utils
+from label_processing.vision import (VisionApi, VisionInput, VisionBackup, RateLimiter,
+                                     create_client, batch_vision_ocr, MAX_BATCH_SIZE)
+from label_processing.result_cache import ResultCache
+from label_processing.text_recognition import decode_qr_code
 
 # Suppress warning messages during execution
 warnings.filterwarnings('ignore')
 
 RESULTS_JSON = "ocr_google_vision.json"
 RESULTS_JSON_BOUNDING = "ocr_google_vision_wbounding.json"
-BACKUP_TSV = "ocr_google_vision_backup.tsv"
+BACKUP_JSONL = "ocr_google_vision_backup.jsonl"
+WORKERS = 1
+READ_AHEAD_BATCHES = 4 #batches read and checked for QR codes at a time
+CACHE_FILENAME = "vision_cache.sqlite"
+CACHE_SIZE_MB = 1024
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -31,7 +40,7 @@ def parse_arguments() -> argparse.Namespace:
         argparse.Namespace: Parsed command-line arguments, including input directories,
         credentials file, output directory, and verbosity flag.
     """
-    usage = 'vision.py [-h] [-np] -d <crop dir> -c <credentials> -o <output dir> -v'
+    usage = 'vision.py [-h] [-np] [-q N] [-s N] [-w N] [-b N] [--qps N] [--no-cache] [--cache_file <path>] [--cache_size N] [--resume] -d <crop dir> -c <credentials> -o <output dir> -v'
 
     parser = argparse.ArgumentParser(
         description="Execute the vision.py module.",
@@ -69,6 +78,86 @@ def parse_arguments() -> argparse.Namespace:
         help='Directory where the JSON outputs will be saved.'
     )
 
+    parser.add_argument(
+        '-q', '--jpeg_quality',
+        metavar='',
+        type=int,
+        default=None,
+        help=('Re-encode the uploaded images as JPG with this quality (1-100)\n'
+              'to reduce the upload size. Default is the original file.')
+    )
+
+    parser.add_argument(
+        '-s', '--max_side',
+        metavar='',
+        type=int,
+        default=None,
+        help=('Downscale the uploaded images to this longest side in pixels.\n'
+              'Default is the original size.')
+    )
+
+    parser.add_argument(
+        '-w', '--workers',
+        metavar='',
+        type=int,
+        default=WORKERS,
+        help=('Number of requests sent concurrently with one shared client.\n'
+              f'The results keep the order of the files. Default is {WORKERS}.')
+    )
+
+    parser.add_argument(
+        '-b', '--batch_size',
+        metavar='',
+        type=int,
+        default=MAX_BATCH_SIZE,
+        help=('Number of images sent in one batch_annotate_images request.\n'
+              f'Default is the maximum of {MAX_BATCH_SIZE}.')
+    )
+
+    parser.add_argument(
+        '--qps',
+        metavar='',
+        type=float,
+        default=None,
+        help=('Maximal number of requests (batches) per second over all workers;\n'
+              'quota errors are retried with exponential backoff. Default is no limit.')
+    )
+
+    parser.add_argument(
+        '--cache',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=('Reuse the transcripts of images already sent in an earlier run,\n'
+              'identified by the SHA-256 of the uploaded bytes. Use --no-cache to disable.')
+    )
+
+    parser.add_argument(
+        '--cache_file',
+        metavar='',
+        type=str,
+        default=None,
+        help=('SQLite file of the response cache.\n'
+              f'Default is {CACHE_FILENAME} in the output directory.')
+    )
+
+    parser.add_argument(
+        '--cache_size',
+        metavar='',
+        type=float,
+        default=CACHE_SIZE_MB,
+        help=('Maximal size of the response cache in megabytes, the least\n'
+              f'recently used entries are removed. Default is {CACHE_SIZE_MB}.')
+    )
+
+    parser.add_argument(
+        '--resume',
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=('Continue an interrupted run: crops already transcribed in the\n'
+              f'backup ({BACKUP_JSONL} in the output directory) are not sent\n'
+              'again and are merged into the results.')
+    )
+
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -78,97 +167,162 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def vision_caller(filename: str, credentials: str, output_dir: str, verbose: bool) -> dict[str, str]:
+def vision_caller(vision_inputs: list[VisionInput], client: vision.ImageAnnotatorClient, verbose: bool,
+                  encoding: str = 'utf8', jpeg_quality: Optional[int] = None, max_side: Optional[int] = None,
+                  limiter: Optional[RateLimiter] = None, batch_size: int = MAX_BATCH_SIZE,
+                  cache: Optional[ResultCache] = None) -> list[dict[str, str]]:
     """
-    Perform OCR on an image file using Google Cloud Vision API.
+    Perform OCR on image files using batched Google Cloud Vision API requests.
 
     Args:
-        filename (str): Path to the image file.
-        credentials (str): Path to the Google Cloud Vision API credentials JSON file.
-        output_dir (str): Directory where the backup TSV file will be saved.
+        vision_inputs (list[VisionInput]): The image files, already read from disk.
+        client (vision.ImageAnnotatorClient): Authenticated client shared by all calls.
         verbose (bool): Flag to enable verbose output.
+        encoding (str, optional): Encoding of the transcripts ('ascii' or 'utf8'). Defaults to 'utf8'.
+        jpeg_quality (int, optional): Re-encode the uploads with this JPG quality. Defaults to None.
+        max_side (int, optional): Downscale the uploads to this longest side. Defaults to None.
+        limiter (RateLimiter, optional): Limits the requests per second. Defaults to None.
+        batch_size (int, optional): Images per request. Defaults to MAX_BATCH_SIZE.
+        cache (ResultCache, optional): Responses of earlier runs, images found
+            there are not sent. Defaults to None.
 
     Returns:
-        dict[str, str]: A dictionary containing the OCR result with 'ID' and 'text'.
+        list[dict[str, str]]: OCR results with 'ID', 'text' and 'bounding_boxes'
+            (or 'error') in the order of vision_inputs.
     """
     if verbose:
-        print(f"[INFO] Processing file: {filename}")
-
-    credentials = service_account.Credentials.from_service_account_file(credentials)
-    client = vision.ImageAnnotatorClient(credentials=credentials)
-
-    with open(filename, 'rb') as image_file:
-        content = image_file.read()
-    image = vision.Image(content=content)
-
-    if verbose:
-        print(f"[INFO] Calling Google Vision API for file: {filename}")
+        print(f"[INFO] Calling Google Vision API for {len(vision_inputs)} file(s), "
+              f"starting with {vision_inputs[0].path}")
 
+    # the bytes read in main are sent, the files are not read again
+    vision_apis = [VisionApi.from_input(vision_input, encoding=encoding,
+                                        jpeg_quality=jpeg_quality, max_side=max_side)
+                   for vision_input in vision_inputs]
     try:
-        response = client.text_detection(image=image)
-        texts = response.text_annotations
+        ocr_results = batch_vision_ocr(vision_apis, client, limiter, batch_size, cache)
     except Exception as e:
-        print(f"[ERROR] Google Vision API request failed for file {filename}: {e}")
-        return {"ID": os.path.basename(filename), "text": "", "error": str(e)}
-
-    ocr_result = {"ID": os.path.basename(filename), "text": texts[0].description if texts else ""}
-    backup_file = os.path.join(output_dir, BACKUP_TSV)
-
-    with open(backup_file, "a", encoding="utf8") as bf:
-        bf.write(f"{ocr_result['ID']}\t{ocr_result['text']}\n")
+        print(f"[ERROR] Google Vision API request failed for files "
+              f"{[vision_input.filename for vision_input in vision_inputs]}: {e}")
+        return [{"ID": vision_input.filename, "text": "", "error": str(e)}
+                for vision_input in vision_inputs]
 
     if verbose:
-        print(f"[INFO] Finished processing file: {filename}")
+        print(f"[INFO] Finished processing {len(ocr_results)} file(s)")
 
-    return ocr_result
+    return ocr_results
 
 
-def detect_qr_code(image_path: str, verbose: bool) -> bool:
+def detect_qr_code(vision_input: VisionInput, verbose: bool) -> bool:
     """
     Detect if an image contains a QR code.
 
     Args:
-        image_path (str): Path to the image file.
+        vision_input (VisionInput): The image file, decoded once and reused for the OCR.
         verbose (bool): Flag to enable verbose output.
 
     Returns:
         bool: True if a QR code is detected, False otherwise.
     """
-    if not os.path.isfile(image_path):
-        if verbose:
-            print(f"[ERROR] File not found: {image_path}")
-        return False
-
-    image = cv2.imread(image_path)
+    image = vision_input.image
     if image is None:
         if verbose:
-            print(f"[ERROR] Error reading image: {image_path}")
+            print(f"[ERROR] Error reading image: {vision_input.path}")
         return False
 
-    qr_detector = cv2.QRCodeDetector()
     try:
-        data, bbox, _ = qr_detector.detectAndDecode(image)
+        # detector is created once per process, decoding only for candidates
+        data = decode_qr_code(image)
         if data:
             if verbose:
-                print(f"[INFO] QR code detected in {image_path}")
+                print(f"[INFO] QR code detected in {vision_input.path}")
             return True
     except cv2.error as e:
         if verbose:
-            print(f"[ERROR] Error detecting QR code in {image_path}: {e}")
+            print(f"[ERROR] Error detecting QR code in {vision_input.path}: {e}")
 
     return False
 
 
-def main(crop_dir: str, credentials: str, output_dir: str, encoding: str = 'utf8', verbose: bool = False) -> None:
+def read_without_qr(filename: str, verbose: bool) -> Optional[VisionInput]:
+    """
+    Read a file once and check it for a QR code.
+
+    Args:
+        filename (str): Path to the image file.
+        verbose (bool): Flag to enable verbose output.
+
+    Returns:
+        Optional[VisionInput]: The read file, None if it contains a QR code.
+    """
+    vision_input = VisionInput.read(filename)
+    if detect_qr_code(vision_input, verbose):
+        return None
+    return vision_input
+
+
+def qr_filtered_batches(filenames: list[str], executor: concurrent.futures.Executor,
+                        verbose: bool, batch_size: int = MAX_BATCH_SIZE) -> Iterator[list[VisionInput]]:
+    """
+    Read the files, skip those that contain a QR code and group the rest into
+    full batches, so that every request (except the last) holds batch_size images.
+
+    The files are read and checked by the executor, READ_AHEAD_BATCHES
+    batches at a time.
+
+    Args:
+        filenames (list[str]): Paths to the image files.
+        executor (concurrent.futures.Executor): Executor reading the files.
+        verbose (bool): Flag to enable verbose output.
+        batch_size (int, optional): Images per request. Defaults to MAX_BATCH_SIZE.
+
+    Yields:
+        list[VisionInput]: The read files of one request, in the order of filenames.
+    """
+    pending: list[VisionInput] = []
+    chunk_size = batch_size * READ_AHEAD_BATCHES
+    for i in range(0, len(filenames), chunk_size):
+        chunk = filenames[i:i + chunk_size]
+        pending.extend(vision_input for vision_input in
+                       executor.map(lambda filename: read_without_qr(filename, verbose), chunk)
+                       if vision_input is not None)
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+
+def main(crop_dir: str, credentials: str, output_dir: str, encoding: str = 'utf8', verbose: bool = False,
+         jpeg_quality: Optional[int] = None, max_side: Optional[int] = None,
+         workers: int = WORKERS, qps: Optional[float] = None,
+         batch_size: int = MAX_BATCH_SIZE, cache: Optional[ResultCache] = None,
+         resume: bool = False) -> None:
     """
     Perform OCR on all JPEG images in a directory using Google Cloud Vision API.
 
+    Every file is read from disk once; the same bytes are decoded for the QR
+    code check and sent to the API. Crops with a QR code are removed before
+    the others are grouped into batches of batch_size images. One client is
+    shared by all worker threads, at most 2 * workers requests are pending. Images whose bytes are already in
+    the cache are not sent again. The entries of every finished batch are
+    appended to a VisionBackup by the main thread; with resume the crops
+    found there are skipped and their entries merged into the results.
+
     Args:
         crop_dir (str): Directory containing the JPEG images to process.
         credentials (str): Path to the Google Cloud Vision API credentials JSON file.
         output_dir (str): Directory where the JSON outputs will be saved.
         encoding (str, optional): Encoding to use for saving files. Defaults to 'utf8'.
         verbose (bool, optional): Flag to enable verbose output. Defaults to False.
+        jpeg_quality (int, optional): Re-encode the uploads with this JPG quality. Defaults to None.
+        max_side (int, optional): Downscale the uploads to this longest side. Defaults to None.
+        workers (int, optional): Number of concurrent requests. Defaults to WORKERS.
+        qps (float, optional): Maximal requests per second. Defaults to None (no limit).
+        batch_size (int, optional): Images per request. Defaults to MAX_BATCH_SIZE.
+        cache (ResultCache, optional): Responses of earlier runs, shared by the
+            worker threads. Defaults to None.
+        resume (bool, optional): Continue from the backup of an interrupted run.
+            Defaults to False.
 
     Returns:
         None
@@ -183,13 +337,42 @@ def main(crop_dir: str, credentials: str, output_dir: str, encoding: str = 'utf8
     if verbose:
         print(f"[INFO] Total number of files found: {len(filenames)}")
 
-    filenames = [file for file in filenames if not detect_qr_code(file, verbose)]
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size has to be between 1 and {MAX_BATCH_SIZE}")
+    backup = VisionBackup(os.path.join(output_dir, BACKUP_JSONL))
+    entries = backup.load() if resume else {}
+    if entries:
+        print(f"[INFO] Resuming: {len(entries)} files have already been transcribed")
+    todo = [filename for filename in filenames if os.path.basename(filename) not in entries]
+    client = create_client(credentials)
+    limiter = RateLimiter(qps)
+
+    def collect(futures: set[concurrent.futures.Future]) -> None:
+        # only this thread writes the backup, in the order the batches finish
+        for future in futures:
+            batch_results = future.result()
+            backup.write(batch_results)
+            for result in batch_results:
+                entries[result["ID"]] = result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor, \
+            backup.open(resume=resume):
+        pending = set()
+        for batch in qr_filtered_batches(todo, executor, verbose, batch_size):
+            # bound the number of read images held by pending requests
+            if len(pending) >= 2 * workers:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(vision_caller, batch, client, verbose, encoding=encoding,
+                                        jpeg_quality=jpeg_quality, max_side=max_side,
+                                        limiter=limiter, batch_size=batch_size, cache=cache))
+        collect(concurrent.futures.wait(pending).done)
+    # keep the order of the files
+    results_json = [entries[os.path.basename(filename)] for filename in filenames
+                    if os.path.basename(filename) in entries]
     if verbose:
-        print(f"[INFO] Number of files to process after filtering QR codes: {len(filenames)}")
-
-    for filename in filenames:
-        result = vision_caller(filename, credentials, output_dir, verbose)
-        results_json.append(result)
+        print(f"[INFO] Number of files processed after filtering QR codes: {len(results_json)}")
 
     print("[INFO] OCR process completed.")
     print("[INFO] Saving OCR results...")
@@ -209,4 +392,16 @@ def main(crop_dir: str, credentials: str, output_dir: str, encoding: str = 'utf8
 if __name__ == '__main__':
     args = parse_arguments()
     vision_caller.processed_count = 0
-    exit(main(args.dir, args.credentials, args.output_dir, verbose=args.verbose))
+    cache = None
+    if args.cache:
+        cache_file = args.cache_file if args.cache_file \
+            else os.path.join(args.output_dir, CACHE_FILENAME)
+        cache = ResultCache(cache_file, max_size_mb=args.cache_size)
+    try:
+        main(args.dir, args.credentials, args.output_dir, verbose=args.verbose,
+             jpeg_quality=args.jpeg_quality, max_side=args.max_side,
+             workers=args.workers, qps=args.qps, batch_size=args.batch_size,
+             cache=cache, resume=args.resume)
+    finally:
+        if cache is not None:
+            cache.close()
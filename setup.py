@@ -29,6 +29,8 @@ setup(
         "matplotlib",
         "nltk",
         "numpy",
+        "onnx",
+        "onnxruntime",
         "opencv-python",
         "pandas",
         "pillow",
@@ -1,6 +1,8 @@
 # Import third-party libraries
 import unittest
 import os
+import filecmp
+import shutil
 from pathlib import Path
 
 # Import the necessary module from the 'label_processing' module package
@@ -38,6 +40,35 @@ class TestTFClassifier(unittest.TestCase):
         Path(empty_dir).mkdir(parents=True, exist_ok=True)
         self.assertRaises(FileNotFoundError, class_prediction, self.model, self.classes, empty_dir, self.outdir)
 
+    def test_class_prediction_batch_size(self):
+        """
+        Test if the predictions do not depend on the batch size.
+
+        This test checks if classifying one picture per model call gives the same
+        classes and scores as the default batches.
+        """
+        df = class_prediction(self.model, self.classes, self.jpg_dir, self.outdir,
+                              batch_size=1)
+        self.assertEqual(list(df["class"]), list(self.df["class"]))
+        np.testing.assert_allclose(df["score"], self.df["score"], rtol=1e-4)
+
+    def test_multi_class_prediction(self):
+        """
+        Test the prediction of several models in one pass.
+
+        This test checks if every model gets a class and score column with the same
+        values as the prediction of the model alone.
+        """
+        df = multi_class_prediction({"hp": self.model, "hp_copy": self.model},
+                                    {"hp": self.classes, "hp_copy": self.classes},
+                                    self.jpg_dir, self.outdir)
+        self.assertTrue(os.path.exists("../testdata/output/cropped_pictures_prediction_classifiers.csv"))
+        self.assertEqual(list(df.columns), ["filename", "hp_class", "hp_score",
+                                            "hp_copy_class", "hp_copy_score"])
+        self.assertEqual(list(df["filename"]), list(self.df["filename"]))
+        self.assertEqual(list(df["hp_copy_class"]), list(self.df["class"]))
+        np.testing.assert_allclose(df["hp_score"], self.df["score"], rtol=1e-4)
+
     def test_create_dirs(self):
         """
         Test the creation of directories based on class predictions.
@@ -74,4 +105,23 @@ class TestTFClassifier(unittest.TestCase):
         for model_class in self.classes:
             picture_count += len(os.listdir(os.path.join(self.outdir, model_class)))
 
-        self.assertEqual(len(os.listdir(self.jpg_dir)), picture_count)
\ No newline at end of file
+        self.assertEqual(len(os.listdir(self.jpg_dir)), picture_count)
+
+    def test_filter_pictures_original_bytes(self):
+        """
+        Test if the sorted pictures keep the bytes of the originals.
+
+        This test checks if every sort mode except 'reencode' places an identical copy
+        (or link) of the original file in the class directory.
+        """
+        for mode in ("reflink", "hardlink", "copy"):
+            test_dir = os.path.join(self.outdir, f"sorted_{mode}")
+            filter_pictures(self.jpg_dir, self.df, test_dir, mode=mode)
+            for _, row in self.df.iterrows():
+                sorted_path = os.path.join(test_dir, row["class"],
+                                           make_file_name(Path(row["filename"]).stem, row["class"]))
+                self.assertTrue(filecmp.cmp(os.path.join(self.jpg_dir, row["filename"]),
+                                            sorted_path, shallow=False))
+            shutil.rmtree(test_dir)
+        with self.assertRaises(ValueError):
+            filter_pictures(self.jpg_dir, self.df, self.outdir, mode="move")
\ No newline at end of file
@@ -5,6 +5,16 @@ import detecto
 
 # Import the necessary module from the 'label_processing' module package
 from label_processing.label_detection_module import *
+from label_processing import label_detection_module
+from label_processing.detection_export import export_torchscript, export_onnx, export_quantized
+from label_processing.result_cache import ResultCache
+import tempfile
+import concurrent.futures
+import shutil
+import pickle
+from unittest import mock
+from types import SimpleNamespace
+from label_evaluation.iou_scores import calculate_iou
 
 
 class TestSegmentationCropping(unittest.TestCase):
@@ -106,4 +116,351 @@ class TestSegmentationCropping(unittest.TestCase):
         create_crops(Path("../testdata/uncropped"), df, out_dir=Path("check_crops"))
         crop_files = glob.glob(os.path.join(Path("check_crops/uncropped_cropped"),'*.jpg'))
         self.assertEqual(len(df),len(crop_files))
-    
\ No newline at end of file
+    
+    def test_class_prediction_parallel_pickled_predictor(self):
+        """
+        Test the parallel class prediction without per-worker model loading.
+
+        Verifies that pickling the predictor per task and loading the model once
+        per worker detect the same number of labels.
+        """
+        df_worker = prediction_parallel("../testdata/uncropped", self.label_predictor, 2)
+        df_pickled = prediction_parallel("../testdata/uncropped", self.label_predictor, 2,
+                                         load_per_worker=False)
+        self.assertEqual(len(df_worker), len(df_pickled))
+
+    def test_predict_batch(self):
+        """
+        Test the batched prediction method of the PredictLabel class.
+
+        Verifies that batched prediction returns a DataFrame with the same columns
+        and number of labels as the prediction of the single images.
+        """
+        file_names = list(Path("../testdata/uncropped").glob("*.jpg"))
+        df = self.label_predictor.predict_batch(file_names, batch_size=4)
+        self.assertIsInstance(df, pd.DataFrame)
+        self.assertEqual(len(df.columns), 7)
+        self.assertEqual(len(df), 16)
+
+    def test_inference_max_side(self):
+        """
+        Test the detection on downsampled images.
+
+        Verifies that the boxes predicted on a downsampled image are scaled back to
+        the coordinates of the original image.
+        """
+        label_predictor = PredictLabel(self.path_to_model, ["label"],
+                                       inference_max_side=1024)
+        height, width = cv2.imread(str(self.jpg_path)).shape[:2]
+        df = label_predictor.class_prediction(self.jpg_path)
+        self.assertGreater(len(df), 0)
+        self.assertLessEqual(max(float(x) for x in df.xmax), width)
+        self.assertLessEqual(max(float(y) for y in df.ymax), height)
+
+    def test_tiled_inference(self):
+        """
+        Test the detection in overlapping tiles.
+
+        Verifies that the merged boxes lie inside the original image and that
+        no two boxes of a tiled prediction are duplicates.
+        """
+        label_predictor = PredictLabel(self.path_to_model, ["label"],
+                                       tile_size=1024, tile_overlap=256)
+        height, width = cv2.imread(str(self.jpg_path)).shape[:2]
+        df = label_predictor.class_prediction(self.jpg_path)
+        self.assertGreater(len(df), 0)
+        self.assertLessEqual(max(float(x) for x in df.xmax), width)
+        self.assertLessEqual(max(float(y) for y in df.ymax), height)
+        boxes = df[['xmin', 'ymin', 'xmax', 'ymax']].round().values.tolist()
+        self.assertEqual(len(boxes), len(set(map(tuple, boxes))))
+
+    def test_prediction_dtypes(self):
+        """
+        Test the column types of the predictions.
+
+        Verifies that scores and coordinates are stored as plain float32 columns.
+        """
+        df = self.label_predictor.class_prediction(self.jpg_path)
+        for column in ['score', 'xmin', 'ymin', 'xmax', 'ymax']:
+            self.assertEqual(df[column].dtype, np.float32)
+
+    def test_prediction_streaming(self):
+        """
+        Test the streaming detection and cropping.
+
+        Verifies that a crop is created for every filtered prediction and that the
+        predictions csv contains the same rows as the returned DataFrame, with the
+        columns of the csv written by clean_predictions.
+        """
+        df = prediction_streaming("../testdata/uncropped", self.label_predictor, 1,
+                                  out_dir=Path("check_stream"))
+        crop_files = glob.glob(os.path.join(Path("check_stream/uncropped_cropped"), '*.jpg'))
+        csv_df = pd.read_csv("check_stream/uncropped_predictions.csv", index_col=0)
+        self.assertEqual(len(df), len(crop_files))
+        self.assertEqual(len(df), len(csv_df))
+        self.assertEqual(list(csv_df.columns), list(df.columns))
+        self.assertEqual(list(csv_df.index), list(range(len(df))))
+        self.assertTrue((df.score >= self.label_predictor.threshold).all())
+
+    def test_exported_backends_parity(self):
+        """
+        Test the TorchScript and ONNX backends against the Detecto model.
+
+        Verifies that every label detected by the Detecto model is also detected by
+        the exported models with nearly the same box, also after the predictor was
+        pickled as for prediction_parallel without per-worker model loading.
+        """
+        expected = self.label_predictor.class_prediction(self.jpg_path)
+        expected = expected[expected.score >= self.label_predictor.threshold]
+        export_dir = Path("check_export")
+        export_dir.mkdir(exist_ok=True)
+        exports = {"torchscript": export_torchscript(self.label_predictor.model,
+                                                     export_dir / "label_detection_model.pt"),
+                   "onnx": export_onnx(self.label_predictor.model,
+                                       export_dir / "label_detection_model.onnx")}
+        for backend, path in exports.items():
+            predictor = PredictLabel(str(path), ["label"], backend=backend)
+            df = predictor.class_prediction(self.jpg_path)
+            boxes = df[['xmin', 'ymin', 'xmax', 'ymax']].to_numpy()
+            for _, row in expected.iterrows():
+                gt_coords = ("label", row.xmin, row.ymin, row.xmax, row.ymax)
+                best_iou = max((calculate_iou(tuple(box), gt_coords) for box in boxes),
+                               default=0.0)
+                self.assertGreater(best_iou, 0.95, backend)
+            unpickled = pickle.loads(pickle.dumps(predictor))
+            self.assertTrue(df.equals(unpickled.class_prediction(self.jpg_path)), backend)
+
+    def test_quantized_backend(self):
+        """
+        Test the int8 quantized backend.
+
+        Verifies that the quantized model can be exported and loaded and returns
+        predictions with the same columns as the Detecto model.
+        """
+        export_dir = Path("check_export")
+        export_dir.mkdir(exist_ok=True)
+        path = export_quantized(self.label_predictor.model,
+                                export_dir / "label_detection_model_int8.pt")
+        predictor = PredictLabel(str(path), ["label"], backend="quantized")
+        df = predictor.class_prediction(self.jpg_path)
+        self.assertIsInstance(df, pd.DataFrame)
+        self.assertEqual(len(df.columns), 7)
+
+    def test_resume_from_journal(self):
+        """
+        Test resuming the parallel prediction from a progress journal.
+
+        Verifies that every image is journaled and that a resumed run returns the
+        same predictions without predicting the journaled images again.
+        """
+        journal_path = Path("check_journal/uncropped_journal.jsonl")
+        df = prediction_parallel("../testdata/uncropped", self.label_predictor, 1,
+                                 journal_path=journal_path)
+        journaled = PredictionJournal(journal_path).load()
+        self.assertEqual(len(journaled), len(list(Path("../testdata/uncropped").glob("*.jpg"))))
+        df_resumed = prediction_parallel("../testdata/uncropped", self.label_predictor, 1,
+                                         journal_path=journal_path, resume=True)
+        self.assertTrue(df.equals(df_resumed))
+
+
+class StubDetectionModel():
+    """
+    Local stand-in for a detecto model with the raw output of Faster R-CNN:
+    one label box and 99 background boxes with a score of 0.05 per image.
+    Like detecto.core.Model.predict it also takes a list of images.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.transform = SimpleNamespace(min_size=(800,), max_size=1333)
+
+    def get_internal_model(self):
+        return self
+
+    def predict(self, image):
+        if isinstance(image, list):
+            return [self.predict(single_image) for single_image in image]
+        self.calls += 1
+        generator = torch.Generator().manual_seed(self.calls)
+        # numpy images are (H, W, 3), transformed tensors (3, H, W)
+        side = min(image.shape[-2:]) if isinstance(image, torch.Tensor) else min(image.shape[:2])
+        corners = torch.rand((99, 2), generator=generator) * (side - 50)
+        boxes = torch.cat([torch.tensor([[10.0, 10.0, 110.0, 60.0]]),
+                           torch.cat([corners, corners + 50], dim=1)])
+        scores = torch.cat([torch.tensor([0.9]), torch.full((99,), 0.05)])
+        return ["label"] * 100, boxes, scores
+
+
+class TestStubDetection(unittest.TestCase):
+    """
+    A test case for tiling, merging and streaming with a stub instead of the
+    trained model.
+    """
+
+    def test_many_tiles_box_count(self):
+        """
+        Test the number of boxes of an image split into many tiles.
+
+        Verifies that the background boxes of every tile are dropped before
+        merging, so that at most one box per tile is left.
+        """
+        model = StubDetectionModel()
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(PredictLabel, "retrieve_model", return_value=model):
+            jpg_path = Path(tmp_dir) / "large.jpg"
+            cv2.imwrite(str(jpg_path), np.zeros((4000, 4000, 3), dtype=np.uint8))
+            predictor = PredictLabel("unused.pth", ["label"], tile_size=512,
+                                     tile_overlap=256)
+            df = predictor.class_prediction(jpg_path)
+        self.assertEqual(model.calls, 15 * 15)
+        self.assertGreater(len(df), 0)
+        self.assertLessEqual(len(df), model.calls)
+        self.assertTrue((df.score >= predictor.threshold).all())
+
+    def test_inference_input_size(self):
+        """
+        Test the input size of the model with inference_max_side.
+
+        Verifies that the model's own resize step uses inference_max_side, so
+        that downsampled images are not upsampled to the default size again,
+        that the default size is restored without it and that the onnx
+        backend, whose input size is fixed, rejects it.
+        """
+        model = StubDetectionModel()
+        with mock.patch.object(PredictLabel, "retrieve_model", return_value=model):
+            predictor = PredictLabel("unused.pth", ["label"], inference_max_side=640)
+            self.assertEqual((model.transform.min_size, model.transform.max_size),
+                             ((640,), 640))
+            predictor.inference_max_side = None
+            self.assertEqual((model.transform.min_size, model.transform.max_size),
+                             ((800,), 1333))
+            with self.assertRaises(ValueError):
+                PredictLabel("unused.pth", ["label"], backend="onnx",
+                             inference_max_side=640)
+
+    def test_merge_boxes(self):
+        """
+        Test the merging of boxes found in overlapping tiles.
+
+        Verifies that the cut off part of a label is merged into the label and
+        that boxes of other classes are kept.
+        """
+        boxes = torch.tensor([[0.0, 0.0, 100.0, 50.0], [0.0, 0.0, 60.0, 50.0],
+                              [0.0, 0.0, 100.0, 50.0], [200.0, 0.0, 300.0, 50.0]])
+        scores = torch.tensor([0.9, 0.95, 0.85, 0.9])
+        labels, merged, merged_scores = merge_boxes(["label", "label", "other", "label"],
+                                                    boxes, scores)
+        self.assertEqual(labels, ["label", "label", "other"])
+        np.testing.assert_allclose(merged_scores.numpy(), [0.95, 0.9, 0.85])
+        self.assertEqual(merged[0].tolist(), [0.0, 0.0, 60.0, 50.0])
+
+    def test_prediction_parallel_tasks(self):
+        """
+        Test the tasks of prediction_parallel.
+
+        Verifies that every task holds several batches, so that the worker can
+        decode the next batch while the model runs, and that all files are
+        predicted once.
+        """
+        model = StubDetectionModel()
+        module = PredictLabel.__module__
+        file_names = list(Path("../testdata/uncropped").glob("*.jpg"))
+        with mock.patch.object(PredictLabel, "retrieve_model", return_value=model), \
+                mock.patch(f"{module}.concurrent.futures.ProcessPoolExecutor",
+                           concurrent.futures.ThreadPoolExecutor), \
+                mock.patch(f"{module}._worker_prediction",
+                           wraps=label_detection_module._worker_prediction) as worker:
+            predictor = PredictLabel("unused.pth", ["label"])
+            df = prediction_parallel("../testdata/uncropped", predictor, 2, batch_size=2)
+        chunk_sizes = [len(call.args[0]) for call in worker.call_args_list]
+        self.assertEqual(chunk_sizes[0], 2 * label_detection_module.BATCHES_PER_TASK)
+        self.assertTrue(all(call.args[1] == 2 for call in worker.call_args_list))
+        self.assertEqual(sum(chunk_sizes), len(file_names))
+        self.assertEqual(model.calls, len(file_names))
+        self.assertEqual(set(df.filename), {file_name.name for file_name in file_names})
+
+    def test_prediction_streaming_resume(self):
+        """
+        Test resuming the streaming detection from a progress journal.
+
+        Verifies that the pictures of the journal are not predicted again and that
+        their rows are written to the csv of the resumed run.
+        """
+        model = StubDetectionModel()
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(PredictLabel, "retrieve_model", return_value=model):
+            predictor = PredictLabel("unused.pth", ["label"])
+            journal_path = Path(tmp_dir) / "uncropped_stream_journal.jsonl"
+            df = prediction_streaming("../testdata/uncropped", predictor, 1,
+                                      out_dir=tmp_dir, journal_path=journal_path)
+            with mock.patch(f"{PredictLabel.__module__}._worker_detect_and_crop") as worker:
+                df_resumed = prediction_streaming("../testdata/uncropped", predictor, 1,
+                                                  out_dir=tmp_dir, journal_path=journal_path,
+                                                  resume=True)
+            worker.assert_not_called()
+            csv_df = pd.read_csv(Path(tmp_dir) / "uncropped_predictions.csv", index_col=0)
+        self.assertEqual(len(df_resumed), len(df))
+        self.assertEqual(sorted(csv_df.filename), sorted(df.filename))
+
+    def test_prediction_cache(self):
+        """
+        Test serving predictions from the cache.
+
+        Verifies that a second run with the same settings, also in worker processes,
+        does not call the model, and that threshold, backend and inference_max_side
+        are part of the cache key.
+        """
+        model = StubDetectionModel()
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(PredictLabel, "retrieve_model", return_value=model):
+            model_path = Path(tmp_dir) / "model.pth"
+            model_path.write_bytes(b"weights")
+            cache = ResultCache(Path(tmp_dir) / "cache.sqlite")
+            jpg_path = next(Path("../testdata/uncropped").glob("*.jpg"))
+            df = PredictLabel(str(model_path), ["label"], cache=cache).class_prediction(jpg_path)
+            df_cached = PredictLabel(str(model_path), ["label"], cache=cache).class_prediction(jpg_path)
+            self.assertEqual(model.calls, 1)
+            self.assertTrue(df.equals(df_cached))
+            for options in ({"threshold": 0.5}, {"backend": "onnx"},
+                            {"inference_max_side": 100}):
+                PredictLabel(str(model_path), ["label"], cache=cache,
+                             **options).class_prediction(jpg_path)
+            self.assertEqual(model.calls, 4)
+            predictor = PredictLabel(str(model_path), ["label"], cache=cache)
+            prediction_parallel("../testdata/uncropped", predictor, 1)
+            with mock.patch.object(StubDetectionModel, "predict",
+                                   side_effect=AssertionError("model called")):
+                df_parallel = prediction_parallel("../testdata/uncropped", predictor, 1)
+            self.assertIn(jpg_path.name, set(df_parallel.filename))
+            cache.close()
+
+    def test_prediction_cache_size_limit(self):
+        """
+        Test the size limit and the eviction order of the cache in worker processes.
+
+        Verifies that the cache is within its size limit after prediction_parallel
+        and that the oldest entries are kept once they were used again, because
+        the workers write the access times of their cache hits.
+        """
+        model = StubDetectionModel()
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(PredictLabel, "retrieve_model", return_value=model):
+            model_path = Path(tmp_dir) / "model.pth"
+            model_path.write_bytes(b"weights")
+            cache = ResultCache(Path(tmp_dir) / "cache.sqlite")
+            predictor = PredictLabel(str(model_path), ["label"], cache=cache)
+            prediction_parallel("../testdata/uncropped", predictor, 1)
+            # one worker stores the entries in the order of the files
+            oldest = cache.connection.execute(
+                "SELECT key, size FROM cache ORDER BY rowid LIMIT 3").fetchall()
+            recent_dir = Path(tmp_dir) / "recent"
+            recent_dir.mkdir()
+            for jpg_path in list(Path("../testdata/uncropped").glob("*.jpg"))[:3]:
+                shutil.copy(jpg_path, recent_dir)
+            prediction_parallel(recent_dir, predictor, 1)
+            cache.max_size_mb = sum(size for _, size in oldest) / 1e6
+            prediction_parallel(recent_dir, predictor, 1)
+            self.assertLessEqual(cache.size(), cache.max_size_mb * 1e6)
+            kept = cache.connection.execute("SELECT key FROM cache").fetchall()
+            self.assertEqual({key for key, in kept}, {key for key, _ in oldest})
+            cache.close()
@@ -0,0 +1,80 @@
+# Import third-party libraries
+import unittest
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+
+# Import the necessary module from the 'label_processing' module package
+from label_processing import result_cache
+from label_processing.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    A test suite for the ResultCache class.
+    """
+    cache_path = Path("../testdata/output/test_cache.sqlite")
+
+    def setUp(self):
+        self.cache = ResultCache(self.cache_path)
+
+    def tearDown(self):
+        self.cache.close()
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists(f"{self.cache_path}{suffix}"):
+                os.remove(f"{self.cache_path}{suffix}")
+
+    def test_put_get(self):
+        """
+        Test storing and looking up a value.
+
+        Checks that a stored value is returned and that unknown keys return None.
+        """
+        self.cache.put("key", "value")
+        self.assertEqual(self.cache.get("key"), "value")
+        self.assertIsNone(self.cache.get("unknown"))
+
+    def test_eviction(self):
+        """
+        Test the size-based eviction.
+
+        Checks that the least recently used entries are removed once the cache
+        exceeds its size limit.
+        """
+        self.cache.max_size_mb = 20 / 1e6
+        for i in range(result_cache.EVICTION_INTERVAL):
+            self.cache.put(f"key_{i}", "0123456789")
+        self.assertLessEqual(self.cache.size(), 20)
+        self.assertIsNone(self.cache.get("key_0"))
+        self.assertEqual(self.cache.get(f"key_{result_cache.EVICTION_INTERVAL - 1}"),
+                         "0123456789")
+
+    def test_access_times(self):
+        """
+        Test the throttled writes of the access times.
+
+        Checks that a cache hit is not written to the file right away, but after
+        ACCESS_FLUSH_INTERVAL hits or when the cache is closed.
+        """
+        self.cache.put("key", "value")
+        query = "SELECT accessed FROM cache WHERE key = 'key'"
+        with sqlite3.connect(self.cache_path) as connection:
+            stored = connection.execute(query).fetchone()[0]
+        self.cache.get("key")
+        with sqlite3.connect(self.cache_path) as connection:
+            self.assertEqual(connection.execute(query).fetchone()[0], stored)
+        self.cache.close()
+        with sqlite3.connect(self.cache_path) as connection:
+            self.assertGreater(connection.execute(query).fetchone()[0], stored)
+
+    def test_pickle(self):
+        """
+        Test pickling an open cache.
+
+        Checks that a pickled cache reopens the connection and sees the stored values.
+        """
+        self.cache.put("key", "value")
+        cache_copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(cache_copy.get("key"), "value")
+        cache_copy.close()
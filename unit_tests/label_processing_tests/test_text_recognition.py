@@ -1,11 +1,15 @@
 # Import third-party libraries
 import unittest
+import importlib.util
+from unittest import mock
 import cv2
 import numpy as np
 from pathlib import Path
 
 # Import the necessary module from the 'label_processing' module package
-from label_processing.text_recognition import ImageProcessor, Tesseract, Threshmode
+from label_processing.text_recognition import ImageProcessor, Tesseract, Threshmode, estimate_skew
+from label_processing.text_recognition import CONFIG, LANGUAGES, _parse_config, summarize_passes, ocr_adaptive
+from label_processing.text_recognition import has_qr_candidate, decode_qr_code
 
 
 class TestImageProcessor(unittest.TestCase):
@@ -62,6 +66,59 @@ class TestImageProcessor(unittest.TestCase):
         if self.image.shape == preprocessor.image.shape:
             self.assertFalse(np.allclose(self.image, preprocessor.image))
 
+    def test_preprocessing_single_deskew(self):
+        """
+        Test the fused preprocessing against the single preprocessing steps.
+
+        Checks if preprocessing gives the same image as grayscale, blur,
+        thresholding and one deskew rotation applied one after another.
+        """
+        preprocessor = ImageProcessor.read_image(self.image_path)
+        processed = preprocessor.preprocessing(Threshmode.ADAPTIVE_MEAN)
+        angle = preprocessor.get_skew_angle()
+        grayscale = cv2.cvtColor(preprocessor.image, cv2.COLOR_BGR2GRAY)
+        expected = ImageProcessor(grayscale, self.image_path).blur()
+        expected = expected.thresholding(Threshmode.ADAPTIVE_MEAN).deskew(angle)
+        self.assertEqual(processed.image.shape, expected.image.shape)
+        self.assertTrue(np.array_equal(processed.image, expected.image))
+
+    def test_estimate_skew(self):
+        """
+        Test the fast skew estimation on a rotated image.
+
+        Checks if the estimated angle changes by the applied rotation.
+        """
+        grayscale = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        rotated = ImageProcessor._rotate(grayscale, 4, 255)
+        angle = estimate_skew(grayscale)
+        self.assertIsInstance(angle, float)
+        self.assertAlmostEqual(estimate_skew(rotated), angle - 4, delta=1)
+
+    def test_preprocessing_variants(self):
+        """
+        Test preprocessing the image for several thresholding modes at once.
+
+        Checks if every variant equals the preprocessing with a single mode.
+        """
+        preprocessor = ImageProcessor.read_image(self.image_path)
+        modes = [Threshmode.OTSU, Threshmode.ADAPTIVE_MEAN, Threshmode.ADAPTIVE_GAUSSIAN]
+        for mode, processed in preprocessor.preprocessing_variants(modes):
+            expected = preprocessor.preprocessing(mode)
+            self.assertTrue(np.array_equal(processed.image, expected.image))
+
+    def test_qr_code_prefilter(self):
+        """
+        Test the QR code prefilter.
+
+        Checks if a crop with a QR code passes the prefilter and is decoded as
+        without prefilter, and if an empty image is rejected.
+        """
+        qr_image = cv2.imread("../testdata/cropped_pictures/coll.mfn-berlin.de_u_8614cd__Preview_label_typed_1.jpg")
+        self.assertTrue(has_qr_candidate(qr_image))
+        self.assertEqual(decode_qr_code(qr_image), decode_qr_code(qr_image, prefilter=False))
+        self.assertIsNotNone(decode_qr_code(qr_image))
+        self.assertFalse(has_qr_candidate(np.full((300, 500, 3), 255, np.uint8)))
+
     def test_save_image(self):
         """
         Test the save_image method of ImageProcessor.
@@ -128,6 +185,72 @@ class TestTesseract(unittest.TestCase):
         tesseract_wrapper = Tesseract(image = preprocessor)
         result = tesseract_wrapper.image_to_string()
         self.assertIsInstance(result["text"], str)
-    
-    
-        
+
+    def test_parse_config(self):
+        """
+        Test reading the modes for the in-process engine from the config.
+        """
+        self.assertEqual(_parse_config(CONFIG), {"psm": 6, "oem": 3})
+        with self.assertRaises(ValueError):
+            Tesseract(backend="binary")
+
+    @unittest.skipUnless(importlib.util.find_spec("tesserocr"), "tesserocr is not installed")
+    def test_image_to_string_api(self):
+        """
+        Test the image_to_string method with the in-process engine.
+
+        Checks if the engine extracts text from a preprocessed image.
+        """
+        preprocessor = ImageProcessor(self.image, self.image_path).preprocessing(Threshmode.OTSU)
+        tesseract_wrapper = Tesseract(image = preprocessor, backend = "api")
+        result = tesseract_wrapper.image_to_string()
+        self.assertIsInstance(result["text"], str)
+
+    def test_two_pass_fallback(self):
+        """
+        Test the two-pass language selection.
+
+        Checks if a confident first pass is kept and a poor one is read again
+        with all languages, and if the passes are summarized per language set.
+        """
+        data = {"text": ["Berlin", "leg."], "conf": [95, 40], "block_num": [1, 1],
+                "par_num": [1, 1], "line_num": [1, 2]}
+        tesseract_wrapper = Tesseract(image = ImageProcessor(self.image, self.image_path),
+                                      first_pass_languages = "eng", min_confidence = 60)
+        with mock.patch("pytesseract.image_to_data", return_value=data), \
+             mock.patch("pytesseract.image_to_string", return_value="Berlin leg. Müller") as full_pass:
+            result = tesseract_wrapper.image_to_string()
+            self.assertEqual(result["text"], "Berlin leg.")
+            full_pass.assert_not_called()
+            kept = tesseract_wrapper.passes
+            tesseract_wrapper.min_confidence = 80
+            result = tesseract_wrapper.image_to_string()
+            self.assertEqual(result["text"], "Berlin leg. Müller")
+        self.assertEqual([languages for languages, _, _ in tesseract_wrapper.passes], ["eng", LANGUAGES])
+        summary = {entry["languages"]: entry for entry in summarize_passes([kept, tesseract_wrapper.passes])}
+        self.assertEqual(summary["eng"]["images"], 1)
+        self.assertEqual(summary["eng"]["passes"], 2)
+        self.assertEqual(summary[LANGUAGES]["images"], 1)
+
+    def test_ocr_adaptive(self):
+        """
+        Test the thresholding retries.
+
+        Checks if a confident first mode is kept without retries and if the
+        mode with the best confidence wins when every mode is poor.
+        """
+        image = ImageProcessor(self.image, self.image_path)
+        tesseract_wrapper = Tesseract()
+        results = [({"ID": image.filename, "text": "Berlin"}, 90.0)]
+        with mock.patch.object(Tesseract, "image_to_string_with_confidence", side_effect=results):
+            transcript, _ = ocr_adaptive(image, tesseract_wrapper)
+        self.assertEqual(transcript["thresholding"], "OTSU")
+        results = [({"ID": image.filename, "text": "a"}, 20.0),
+                   ({"ID": image.filename, "text": "Berlin"}, 50.0),
+                   ({"ID": image.filename, "text": "Berl"}, 40.0)]
+        with mock.patch.object(Tesseract, "image_to_string_with_confidence", side_effect=results) as ocr:
+            transcript, processed = ocr_adaptive(image, tesseract_wrapper)
+            self.assertEqual(ocr.call_count, 3)
+        self.assertEqual(transcript["thresholding"], "ADAPTIVE_MEAN")
+        self.assertEqual(transcript["text"], "Berlin")
+        self.assertIsInstance(processed.image, np.ndarray)
@@ -1,9 +1,15 @@
 # Import third-party libraries
 import unittest
+import time
+import tempfile
 from pathlib import Path
+from google.api_core import exceptions
+from google.cloud import vision
 
 # Import the necessary module from the 'label_processing' module package
-from label_processing.vision import VisionApi
+from label_processing.vision import VisionApi, VisionInput, RateLimiter, call_with_retry
+from label_processing.vision import batch_vision_ocr, make_batches, VisionBackup
+from label_processing.result_cache import ResultCache
 
 class TestVisionApi(unittest.TestCase):
     """
@@ -37,4 +43,183 @@ class TestVisionApi(unittest.TestCase):
 
         This test is a placeholder and can be extended to test the vision_ocr method when implemented.
         """
-        pass
\ No newline at end of file
+        pass
+
+
+class TestVisionInput(unittest.TestCase):
+    """
+    A test suite for the VisionInput class.
+    """
+    image_path: Path =  Path("../testdata/cropped_pictures/coll.mfn-berlin.de_u_115ff7__Preview_label_typed_1.jpg")
+
+    def test_upload_bytes(self):
+        """
+        Test the bytes sent to the API.
+
+        Checks if the original file content is sent without options and if a
+        downscaled upload is smaller and records its scale.
+        """
+        vision_input = VisionInput.read(str(self.image_path))
+        with open(self.image_path, 'rb') as image_file:
+            self.assertEqual(vision_input.upload_bytes(), image_file.read())
+        self.assertEqual(vision_input.scale, 1.0)
+        height, width = vision_input.image.shape[:2]
+        upload = vision_input.upload_bytes(jpeg_quality=70, max_side=max(height, width) // 2)
+        self.assertLess(len(upload), len(vision_input.content))
+        self.assertAlmostEqual(vision_input.scale, 0.5, places=2)
+        vision_api = VisionApi.from_input(vision_input, "test", max_side=max(height, width) // 2)
+        self.assertEqual(vision_api.scale, vision_input.scale)
+
+
+class TestRateLimiting(unittest.TestCase):
+    """
+    A test suite for the rate limiting and retries of Vision requests.
+    """
+
+    def test_rate_limiter(self):
+        """
+        Test if the RateLimiter spaces the requests by 1/qps seconds.
+        """
+        limiter = RateLimiter(qps=50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 * 0.9)
+
+    def test_call_with_retry(self):
+        """
+        Test if quota errors are retried and other errors are raised at once.
+        """
+        attempts = []
+        def request():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise exceptions.ResourceExhausted("quota exceeded")
+            return "response"
+        self.assertEqual(call_with_retry(request, backoff=0.001), "response")
+        self.assertEqual(len(attempts), 3)
+        def invalid_request():
+            attempts.append(1)
+            raise exceptions.InvalidArgument("bad image")
+        attempts.clear()
+        with self.assertRaises(exceptions.InvalidArgument):
+            call_with_retry(invalid_request, backoff=0.001)
+        self.assertEqual(len(attempts), 1)
+
+
+class StubVisionClient():
+    """
+    Local stand-in for vision.ImageAnnotatorClient answering batch requests
+    without network access. The text of an image is its size in bytes, images
+    of 0 bytes get an error.
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def batch_annotate_images(self, requests):
+        self.batch_sizes.append(len(requests))
+        responses = []
+        for request in requests:
+            size = len(request.image.content)
+            if size == 0:
+                responses.append(vision.AnnotateImageResponse(error={"message": "Bad image data."}))
+                continue
+            box = {"vertices": [{"x": 10, "y": 20}, {"x": 110, "y": 20},
+                                {"x": 110, "y": 60}, {"x": 10, "y": 60}]}
+            responses.append(vision.AnnotateImageResponse(text_annotations=[
+                {"description": f"{size}\nbytes", "bounding_poly": box}]))
+        return vision.BatchAnnotateImagesResponse(responses=responses)
+
+
+class TestBatchVisionOcr(unittest.TestCase):
+    """
+    A test suite for the batched Vision requests.
+    """
+
+    def test_make_batches(self):
+        """
+        Test the grouping of images by number and size.
+        """
+        vision_apis = [VisionApi(f"{i}.jpg", b"x" * 10, None, "utf8") for i in range(40)]
+        self.assertEqual([len(batch) for batch in make_batches(vision_apis)], [16, 16, 8])
+        self.assertEqual([len(batch) for batch in make_batches(vision_apis[:5], max_bytes=25)], [2, 2, 1])
+        with self.assertRaises(ValueError):
+            make_batches(vision_apis, batch_size=17)
+
+    def test_batch_vision_ocr(self):
+        """
+        Test if the batched responses are split into one entry per image.
+
+        Checks the order, the processed text, the bounding boxes scaled back
+        to the original image and the error entry of a bad image.
+        """
+        vision_apis = [VisionApi(f"{i}.jpg", b"x" * (i + 1), None, "utf8", scale=0.5) for i in range(20)]
+        vision_apis[3].image = b""
+        client = StubVisionClient()
+        entries = batch_vision_ocr(vision_apis, client)
+        self.assertEqual(client.batch_sizes, [16, 4])
+        self.assertEqual([entry["ID"] for entry in entries], [f"{i}.jpg" for i in range(20)])
+        self.assertEqual(entries[0]["text"], "1 bytes")
+        self.assertEqual(entries[0]["bounding_boxes"][0][0], {"1\nbytes": "(20,40)"})
+        self.assertEqual(entries[3]["text"], "")
+        self.assertIn("Bad image data.", entries[3]["error"])
+
+    def test_batch_vision_ocr_cache(self):
+        """
+        Test if images already in the cache are not sent again.
+
+        A copy of an image under another filename is answered from the cache
+        with its own ID, entries with errors are not cached.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResultCache(Path(tmp_dir) / "vision_cache.sqlite")
+            vision_apis = [VisionApi(f"{i}.jpg", b"x" * (i + 1), None, "utf8") for i in range(3)]
+            vision_apis[2].image = b""
+            entries = batch_vision_ocr(vision_apis, StubVisionClient(), cache=cache)
+            client = StubVisionClient()
+            copies = [VisionApi(f"copy_{i}.jpg", vision_api.image, None, "utf8")
+                      for i, vision_api in enumerate(vision_apis)]
+            cached_entries = batch_vision_ocr(copies, client, cache=cache)
+            self.assertEqual(client.batch_sizes, [1])
+            self.assertEqual([entry["ID"] for entry in cached_entries],
+                             ["copy_0.jpg", "copy_1.jpg", "copy_2.jpg"])
+            self.assertEqual(cached_entries[1]["text"], entries[1]["text"])
+            self.assertEqual(cached_entries[1]["bounding_boxes"], entries[1]["bounding_boxes"])
+            self.assertEqual(copies[0].vision_ocr(object(), cache=cache)["text"], "1 bytes")
+            cache.close()
+
+
+class TestVisionBackup(unittest.TestCase):
+    """
+    A test suite for the backup of interrupted Vision runs.
+    """
+
+    def test_backup_resume(self):
+        """
+        Test if texts with tabs and newlines are restored, and if entries
+        with errors and a cut off line (also inside a multibyte character)
+        are sent again after resuming.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "backup.jsonl"
+            with VisionBackup(path).open() as backup:
+                backup.write([{"ID": "a.jpg", "text": "col1\tcol2\nline2"},
+                              {"ID": "b.jpg", "text": "", "error": "Bad image data."}])
+            with open(path, "a", encoding="utf8") as f:
+                f.write('{"ID": "c.jpg", "te')
+            self.assertEqual(VisionBackup(path).load(),
+                             {"a.jpg": {"ID": "a.jpg", "text": "col1\tcol2\nline2"}})
+            with VisionBackup(path).open(resume=True) as backup:
+                backup.write([{"ID": "c.jpg", "text": "c"}])
+            self.assertEqual(list(VisionBackup(path).load()), ["a.jpg", "c.jpg"])
+            with open(path, "ab") as f:
+                # interrupted inside a multibyte character
+                f.write('{"ID": "d.jpg", "text": "Grü'.encode("utf8")[:-1])
+            self.assertEqual(list(VisionBackup(path).load()), ["a.jpg", "c.jpg"])
+            with VisionBackup(path).open(resume=True) as backup:
+                backup.write([{"ID": "d.jpg", "text": "Grün"}])
+            self.assertEqual(VisionBackup(path).load()["d.jpg"]["text"], "Grün")
+            with VisionBackup(path).open():
+                pass
+            self.assertEqual(VisionBackup(path).load(), {})